@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+
+_MISSING = object()
+
+
+class LazyProxy:
+    """
+    延迟创建的模块级单例代理，首次访问属性时才调用 factory 创建实例，之后的访问都转发给该实例。
+    用于连接池、第三方 SDK 客户端等创建开销大的模块级实例，避免 import 时就初始化。
+    >>> tencent_sms_client = LazyProxy(TencentSMSClient)
+    >>> await tencent_sms_client.send_sms(...)  # 此时才创建 TencentSMSClient
+    """
+    __slots__ = ("_factory", "_instance", "_lock")
+
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", _MISSING)
+        object.__setattr__(self, "_lock", Lock())
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not _MISSING
+
+    def get_instance(self):
+        """返回被代理的实例，需要真实对象(如 isinstance 判断)时使用"""
+        if self._instance is _MISSING:
+            with self._lock:
+                if self._instance is _MISSING:
+                    object.__setattr__(self, "_instance", self._factory())
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self.get_instance(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.get_instance(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self.get_instance(), name)
+
+    def __dir__(self):
+        return dir(self.get_instance())
+
+    def __repr__(self):
+        if self._instance is _MISSING:
+            return f"<LazyProxy of {self._factory!r} (not initialized)>"
+        return repr(self._instance)
@@ -1,6 +1,15 @@
 import asyncio
+import base64
+import time
+import bson
+from bson import json_util
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import UpdateOne
+from pymongo import UpdateOne, ASCENDING
+from pymongo.errors import BulkWriteError
+from common_sdk.dao.mongo.document_cache import make_query_key
+from common_sdk.dao.mongo.enum_view import EnumView
+from common_sdk.dao.mongo.pool_listener import MongoPoolListener
+from common_sdk.dao.mongo.random_sampler import RandomSampler
 from common_sdk.util import date_utils
 from common_sdk.logging.logger import logger
 from common_sdk.system.sys_env import get_env
@@ -8,58 +17,102 @@ from common_sdk.system.sys_env import get_env
 
 class SingletonAsyncMongodbClientHelper:
     _instances = {}
+    _collections = {}  # (connect_url, db_name, coll_name) -> collection
     _lock = asyncio.Lock()
 
-    def __init__(self, connect_url):
+    def __init__(self, connect_url, max_pool_size=250, min_pool_size=10, max_idle_time_ms=30000,
+                 pool_telemetry=False):
         self.connect_url = connect_url
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.max_idle_time_ms = max_idle_time_ms
+        self.pool_telemetry = pool_telemetry
         self._mongo_client = None  # 延迟初始化
 
+    @property
+    def pool_options(self):
+        return {
+            "max_pool_size": self.max_pool_size,
+            "min_pool_size": self.min_pool_size,
+            "max_idle_time_ms": self.max_idle_time_ms,
+            "pool_telemetry": self.pool_telemetry,
+        }
+
     @property
     async def mongo_client(self):
         if self._mongo_client is None:
             async with self._lock:
                 if self._mongo_client is None:
+                    # 开启监控时可通过 common_sdk.dao.pool_telemetry.pool_stats() 查看连接池指标
+                    event_listeners = [MongoPoolListener()] if self.pool_telemetry else []
                     self._mongo_client = AsyncIOMotorClient(
                         self.connect_url,
-                        maxPoolSize=250,
-                        minPoolSize=10,
-                        maxIdleTimeMS=30000
+                        maxPoolSize=self.max_pool_size,
+                        minPoolSize=self.min_pool_size,
+                        maxIdleTimeMS=self.max_idle_time_ms,
+                        event_listeners=event_listeners
                     )
         return self._mongo_client
 
     @classmethod
-    async def get_instance(cls, connect_url):
+    async def get_instance(cls, connect_url, **pool_options):
+        """获取 connect_url 对应的单例，连接池参数只在首次创建时生效"""
+        # 已创建的实例直接读取，不再竞争锁
+        instance = cls._instances.get(connect_url)
+        if instance is not None:
+            return instance
         async with cls._lock:
             if connect_url not in cls._instances:
-                cls._instances[connect_url] = cls(connect_url)
+                cls._instances[connect_url] = cls(connect_url, **pool_options)
             return cls._instances[connect_url]
 
     @classmethod
-    async def get_database(cls, connect_url, db_name):
-        instance = await cls.get_instance(connect_url)
+    async def get_database(cls, connect_url, db_name, **pool_options):
+        instance = await cls.get_instance(connect_url, **pool_options)
         return (await instance.mongo_client)[db_name]
 
     @classmethod
-    async def get_collection(cls, connect_url, db_name, coll_name):
-        database = await cls.get_database(connect_url, db_name)
-        return database[coll_name]
+    async def get_collection(cls, connect_url, db_name, coll_name, **pool_options):
+        key = (connect_url, db_name, coll_name)
+        collection = cls._collections.get(key)
+        if collection is None:
+            database = await cls.get_database(connect_url, db_name, **pool_options)
+            collection = cls._collections.setdefault(key, database[coll_name])
+        return collection
 
 
 class AsyncMongodbClientHelper(SingletonAsyncMongodbClientHelper):
     _maximum_documents = 10000
 
-    def __init__(self, connect_url=None):
-        super().__init__(connect_url)
+    def __init__(self, connect_url=None, document_cache=None, query_profiler=None, single_flight=None,
+                 random_sampler=None, **pool_options):
+        """
+        Args:
+            connect_url: 连接串，默认读取环境变量 MONGODB_CONNECTION_STRING
+            document_cache: 可选的 DocumentCache，开启后 get 走读穿透缓存，写入和删除时按 id 自动失效
+            query_profiler: 可选的 QueryProfiler，开启后对查询采样 explain 并给出索引建议
+            single_flight: 可选的 SingleFlight，开启后相同参数的并发 get/list 只向 Mongo 发送一次查询
+            random_sampler: 可选的 RandomSampler，get_random_document 未指定 strategy 时按集合统计自动选择取样策略
+            pool_options: max_pool_size/min_pool_size/max_idle_time_ms/pool_telemetry，同一连接串首次创建客户端时生效
+        """
+        super().__init__(connect_url, **pool_options)
         self.connect_url = connect_url or get_env('MONGODB_CONNECTION_STRING')
+        self.document_cache = document_cache
+        self.query_profiler = query_profiler
+        self.single_flight = single_flight
+        self.random_sampler = random_sampler
+        self._explicit_sampler = None  # 未配置 random_sampler 时显式指定策略使用的取样器，不改变默认行为
+        self._enum_views = {}
 
     async def add_or_update(self, db_name, coll_name, json_data):
-        collection = await self.get_collection(self.connect_url, db_name, coll_name)
+        collection = await self._get_collection(db_name, coll_name)
         matcher = {"id": json_data.get("id")}
         json_data['updateTime'] = date_utils.timestamp_second()
         await collection.update_one(matcher, {"$set": json_data}, upsert=True)
+        await self._invalidate_cache(db_name, coll_name, [json_data.get("id")])
 
     async def add_or_update_many(self, db_name, coll_name, json_datas):
-        collection = await self.get_collection(self.connect_url, db_name, coll_name)
+        collection = await self._get_collection(db_name, coll_name)
         timestamp = date_utils.timestamp_second()
         operations = []
         for json_data in json_datas:
@@ -69,51 +122,301 @@ class AsyncMongodbClientHelper(SingletonAsyncMongodbClientHelper):
             )
         if operations:
             result = await collection.bulk_write(operations)
+            await self._invalidate_cache(db_name, coll_name, [json_data.get("id") for json_data in json_datas])
             return result.acknowledged, result.modified_count
 
+    async def bulk_upsert(self, db_name, coll_name, json_datas, chunk_size=1000, max_chunk_bytes=8 * 1024 * 1024,
+                          concurrency=4, ordered=False):
+        """
+        大批量按 id upsert 文档。
+
+        文档按数量(chunk_size)和 BSON 大小(max_chunk_bytes)切分成多个批次，
+        在 concurrency 的并发上限内以 bulk_write 并发写入，单个批次失败不影响其他批次。
+
+        Args:
+            json_datas: 文档的列表、迭代器或异步迭代器
+            ordered: 批次内是否按顺序写入，默认无序以获得更高吞吐
+
+        Returns:
+            dict: upserted/modified/matched/errors 汇总计数、批次数及批次耗时统计(毫秒)
+        """
+        collection = await self._get_collection(db_name, coll_name)
+        timestamp = date_utils.timestamp_second()
+        semaphore = asyncio.Semaphore(concurrency)
+        stats = {"upserted": 0, "modified": 0, "matched": 0, "errors": 0, "chunks": 0}
+        latencies = []
+        tasks = set()
+
+        async def write_chunk(operations, doc_ids):
+            start = time.perf_counter()
+            try:
+                result = await collection.bulk_write(operations, ordered=ordered)
+                stats["upserted"] += result.upserted_count
+                stats["modified"] += result.modified_count
+                stats["matched"] += result.matched_count
+            except BulkWriteError as e:
+                details = e.details
+                stats["upserted"] += details.get("nUpserted", 0)
+                stats["modified"] += details.get("nModified", 0)
+                stats["matched"] += details.get("nMatched", 0)
+                stats["errors"] += len(details.get("writeErrors", []))
+            except Exception as e:
+                logger.error(f"bulk_upsert 批次写入失败: {db_name}.{coll_name}, 数量={len(operations)}, 错误={e}")
+                stats["errors"] += len(operations)
+            finally:
+                latencies.append((time.perf_counter() - start) * 1000)
+                semaphore.release()
+            await self._invalidate_cache(db_name, coll_name, doc_ids)
+
+        async def submit(operations, doc_ids):
+            # 先占用并发名额再提交，避免上游生产过快时积压大量批次
+            await semaphore.acquire()
+            stats["chunks"] += 1
+            task = asyncio.create_task(write_chunk(operations, doc_ids))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        operations, doc_ids, chunk_bytes = [], [], 0
+        try:
+            async for json_data in self._iterate(json_datas):
+                json_data['updateTime'] = timestamp
+                document_bytes = len(bson.encode(json_data))
+                if operations and (len(operations) >= chunk_size or chunk_bytes + document_bytes > max_chunk_bytes):
+                    await submit(operations, doc_ids)
+                    operations, doc_ids, chunk_bytes = [], [], 0
+                operations.append(UpdateOne({"id": json_data.get("id")}, {"$set": json_data}, upsert=True))
+                doc_ids.append(json_data.get("id"))
+                chunk_bytes += document_bytes
+            if operations:
+                await submit(operations, doc_ids)
+        except BaseException as e:
+            # 数据源中途抛出异常时，等待已提交的批次写完(并完成缓存失效)再抛出，记录已写入的部分
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            logger.error(f"bulk_upsert 数据源异常中断: {db_name}.{coll_name}, 已提交批次={stats['chunks']}, "
+                         f"upserted={stats['upserted']}, modified={stats['modified']}, 错误={e!r}")
+            raise
+        if tasks:
+            await asyncio.gather(*tasks)
+
+        stats["latency"] = self._summarize_latencies(latencies)
+        return stats
+
     async def get(self, db_name, coll_name, conditions):
-        collection = await self.get_collection(self.connect_url, db_name, coll_name)
-        return await collection.find_one(conditions, {"_id": 0}) if conditions else None
+        if not conditions:
+            return None
+        collection = await self._get_collection(db_name, coll_name)
+        self._observe_query(collection, conditions, limit=1)
+
+        def loader():
+            return self._coalesce(
+                make_query_key(db_name, coll_name, conditions, "get"),
+                lambda: collection.find_one(conditions, {"_id": 0})
+            )
+
+        if self.document_cache is None:
+            return await loader()
+        return await self.document_cache.get(db_name, coll_name, conditions, loader)
 
     async def list(self, db_name, coll_name, comparisons=None, matcher=None, order_by=None, page=None, size=None):
-        collection = await self.get_collection(self.connect_url, db_name, coll_name)
-        matcher = matcher or {}
-        contrasts = self._build_comparison_filters(comparisons)
-        matcher.update(contrasts)
+        collection = await self._get_collection(db_name, coll_name)
+        matcher = self._build_matcher(comparisons, matcher)
 
+        self._observe_query(collection, matcher, order_by, size or self._maximum_documents)
         cursor = collection.find(matcher, {"_id": 0})
         cursor = self.limit_documents(cursor, order_by, page, size)
-        result = await cursor.to_list(length=None)
+        key = make_query_key(db_name, coll_name, matcher, "list", {"_id": 0}, order_by, page, size)
+        result = await self._coalesce(key, lambda: cursor.to_list(length=None))
         return result
 
+    async def iter_list(self, db_name, coll_name, comparisons=None, matcher=None, order_by=None, projection=None,
+                        batch_size=1000, size=None):
+        """
+        以异步生成器的方式逐条返回查询结果，不受 _maximum_documents 限制。
+
+        游标按 batch_size 分批从服务端拉取，只有消费方取完当前批次后才会请求下一批，
+        因此内存占用与结果集大小无关，可直接对接 NDJSON/StreamingResponse 输出。
+
+        Args:
+            projection: 返回字段，默认返回除 _id 外的全部字段
+            batch_size: 每批从服务端拉取的文档数量
+            size: 返回的最大文档数量，为空时不限制
+        """
+        collection = await self._get_collection(db_name, coll_name)
+        matcher = self._build_matcher(comparisons, matcher)
+        projection = {"_id": 0, **projection} if projection else {"_id": 0}
+
+        self._observe_query(collection, matcher, order_by, size)
+        cursor = collection.find(matcher, projection).batch_size(batch_size)
+        if order_by:
+            cursor = cursor.sort(order_by)
+        if size:
+            cursor = cursor.limit(size)
+        try:
+            async for document in cursor:
+                yield document
+        finally:
+            await cursor.close()
+
+    async def list_after(self, db_name, coll_name, comparisons=None, matcher=None, order_by=None, after=None,
+                         size=None, hint=False):
+        """
+        基于游标（keyset）的分页查询，深翻页的代价与第一页相同。
+
+        排序字段会自动补上 id 作为唯一的决胜字段，参与排序的字段在文档中必须存在。
+
+        Args:
+            order_by: 排序字段，格式同 limit_documents
+            after: 上一页返回的续页令牌，为空时从第一页开始
+            size: 每页数量，默认 _maximum_documents
+            hint: 为 True 时使用与排序一致的复合索引（需先调用 ensure_keyset_index 建立）
+
+        Returns:
+            (文档列表, 下一页令牌)，没有下一页时令牌为 None
+        """
+        collection = await self._get_collection(db_name, coll_name)
+        sort_keys = self._build_keyset_sort(order_by)
+        size = size or self._maximum_documents
+        matcher = self._build_matcher(comparisons, matcher)
+        if after:
+            keyset = self._build_keyset_filter(sort_keys, self._decode_keyset_token(after, sort_keys))
+            matcher = {"$and": [matcher, keyset]} if matcher else keyset
+
+        self._observe_query(collection, matcher, sort_keys, size + 1)
+        cursor = collection.find(matcher, {"_id": 0}).sort(sort_keys)
+        if hint:
+            cursor = cursor.hint(sort_keys)
+        # 多取一条用于判断是否还有下一页
+        documents = await cursor.limit(size + 1).to_list(length=None)
+        if len(documents) <= size:
+            return documents, None
+        documents = documents[:size]
+        return documents, self._encode_keyset_token(sort_keys, documents[-1])
+
+    async def iter_pages(self, db_name, coll_name, comparisons=None, matcher=None, order_by=None, after=None,
+                         size=None, hint=False):
+        """按 keyset 分页逐页返回 (文档列表, 下一页令牌)，直到没有下一页"""
+        while True:
+            documents, after = await self.list_after(
+                db_name, coll_name, comparisons, matcher, order_by, after, size, hint
+            )
+            if documents:
+                yield documents, after
+            if not after:
+                return
+
+    async def ensure_keyset_index(self, db_name, coll_name, order_by=None):
+        """建立与 list_after 排序一致的复合索引，返回索引名"""
+        collection = await self._get_collection(db_name, coll_name)
+        return await collection.create_index(self._build_keyset_sort(order_by))
+
+    def query_report(self):
+        """返回 QueryProfiler 采样得到的查询统计，未开启时返回空列表"""
+        return self.query_profiler.report() if self.query_profiler is not None else []
+
+    async def ensure_indexes(self, db_name=None, coll_name=None):
+        """
+        按 QueryProfiler 的建议创建索引，可按库名/集合名过滤。
+
+        Returns:
+            list: 创建(或已存在)的索引名称
+        """
+        if self.query_profiler is None:
+            return []
+        created = []
+        for suggestion in self.query_profiler.suggestions():
+            if db_name and suggestion["db_name"] != db_name or coll_name and suggestion["coll_name"] != coll_name:
+                continue
+            collection = await self._get_collection(suggestion["db_name"], suggestion["coll_name"])
+            name = await collection.create_index(suggestion["keys"], background=True)
+            logger.info(f"创建索引: {collection.full_name} {name}")
+            created.append(name)
+        return created
+
     async def delete(self, db_name, coll_name, doc_id):
-        collection = await self.get_collection(self.connect_url, db_name, coll_name)
+        collection = await self._get_collection(db_name, coll_name)
         result = await collection.delete_one({'id': doc_id})
+        await self._invalidate_cache(db_name, coll_name, [doc_id])
         return result.deleted_count
 
     async def get_enums(self, db_name, coll_name, fields, conditions=None):
-        collection = await self.get_collection(self.connect_url, db_name, coll_name)
+        collection = await self._get_collection(db_name, coll_name)
         if not fields:
             raise ValueError("At least one field must be provided for grouping.")
+        view = self._enum_views.get(make_query_key(db_name, coll_name, conditions, list(fields)))
+        if view is not None and view.ready:
+            return view.result()
         pipeline = self._build_enum_pipeline(fields, conditions)
         result = await collection.aggregate(pipeline).to_list(length=None)
         return result
 
-    async def get_random_document(self, db_name, coll_name, size=1, conditions=None):
+    async def register_enum_view(self, db_name, coll_name, fields, conditions=None, poll_interval=5,
+                                 resync_interval=300, start_timeout=30):
+        """
+        为 (集合, 分组字段, 条件) 注册增量物化视图，之后相同参数的 get_enums 直接读取内存中的分组计数。
+
+        视图优先由 change stream 增量维护，不支持时退化为按 updateTime 轮询。
+        首次加载超过 start_timeout 秒未完成时注册失败，抛出期间遇到的第一个错误。
+        """
+        key = make_query_key(db_name, coll_name, conditions, list(fields))
+        view = self._enum_views.get(key)
+        if view is None:
+            collection = await self._get_collection(db_name, coll_name)
+            view = EnumView(collection, fields, conditions, poll_interval, resync_interval, start_timeout)
+            self._enum_views[key] = view
+            try:
+                await view.start()
+            except Exception:
+                del self._enum_views[key]
+                raise
+        return view
+
+    async def unregister_enum_view(self, db_name, coll_name, fields, conditions=None):
+        view = self._enum_views.pop(make_query_key(db_name, coll_name, conditions, list(fields)), None)
+        if view is not None:
+            await view.close()
+
+    async def close_enum_views(self):
+        views, self._enum_views = list(self._enum_views.values()), {}
+        for view in views:
+            await view.close()
+
+    async def iter_enums(self, db_name, coll_name, fields, conditions=None, batch_size=1000):
+        """get_enums 的流式版本，分组结果按 batch_size 分批拉取并逐条返回"""
+        collection = await self._get_collection(db_name, coll_name)
+        if not fields:
+            raise ValueError("At least one field must be provided for grouping.")
+        pipeline = self._build_enum_pipeline(fields, conditions)
+        cursor = collection.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size)
+        try:
+            async for document in cursor:
+                yield document
+        finally:
+            await cursor.close()
+
+    async def get_random_document(self, db_name, coll_name, size=1, conditions=None, strategy=None):
         """
-        从 MongoDB 的指定集合中随机获取一条文档。
+        从 MongoDB 的指定集合中随机获取文档。
 
-        :return: 随机选择的文档 (以字典形式返回)，如果集合为空则返回 None
+        Args:
+            strategy: 取样策略，见 RandomSampler；为空时若配置了 random_sampler 则自动选择，否则使用 $sample
+
+        :return: 随机选择的文档列表，如果集合为空则返回空列表
         """
-        # 构建聚合管道
-        pipeline = []
-        # 使用 $sample 随机获取一条文档
-        if conditions:
-            pipeline.append({"$match": conditions})
-        pipeline.append({"$sample": {"size": size}})
-        collection = await self.get_collection(self.connect_url, db_name, coll_name)
-        cursor = collection.aggregate(pipeline)
-        return [doc async for doc in cursor]
+        collection = await self._get_collection(db_name, coll_name)
+        if self.random_sampler is None:
+            if strategy in (None, RandomSampler.SAMPLE):
+                # 构建聚合管道，使用 $sample 随机获取文档
+                pipeline = []
+                if conditions:
+                    pipeline.append({"$match": conditions})
+                pipeline.append({"$sample": {"size": size}})
+                cursor = collection.aggregate(pipeline)
+                return [doc async for doc in cursor]
+            if self._explicit_sampler is None:
+                self._explicit_sampler = RandomSampler()
+            return await self._explicit_sampler.sample(collection, size, conditions, strategy)
+        return await self.random_sampler.sample(collection, size, conditions, strategy or RandomSampler.AUTO)
 
     def limit_documents(self, cursor, order_by=None, page=1, size=None):
         if order_by:
@@ -126,6 +429,94 @@ class AsyncMongodbClientHelper(SingletonAsyncMongodbClientHelper):
             cursor = cursor.skip((page - 1) * size)
         return cursor.limit(limit)
 
+    async def _get_collection(self, db_name, coll_name):
+        return await self.get_collection(self.connect_url, db_name, coll_name, **self.pool_options)
+
+    async def _coalesce(self, key, func):
+        if self.single_flight is None:
+            return await func()
+        return await self.single_flight.do(key, func)
+
+    def _observe_query(self, collection, matcher, order_by=None, limit=None):
+        if self.query_profiler is not None:
+            self.query_profiler.observe(collection, matcher, order_by, limit)
+
+    async def _invalidate_cache(self, db_name, coll_name, doc_ids):
+        if self.document_cache is not None:
+            await self.document_cache.invalidate(db_name, coll_name, doc_ids)
+
+    @staticmethod
+    async def _iterate(items):
+        if hasattr(items, "__aiter__"):
+            async for item in items:
+                yield item
+        else:
+            for item in items:
+                yield item
+
+    @staticmethod
+    def _summarize_latencies(latencies):
+        if not latencies:
+            return {"count": 0, "min_ms": 0, "max_ms": 0, "avg_ms": 0, "p95_ms": 0}
+        ordered = sorted(latencies)
+        return {
+            "count": len(ordered),
+            "min_ms": round(ordered[0], 3),
+            "max_ms": round(ordered[-1], 3),
+            "avg_ms": round(sum(ordered) / len(ordered), 3),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        }
+
+    def _build_matcher(self, comparisons, matcher):
+        matcher = dict(matcher or {})
+        matcher.update(self._build_comparison_filters(comparisons))
+        return matcher
+
+    @staticmethod
+    def _build_keyset_sort(order_by):
+        if not order_by:
+            sort_keys = []
+        elif isinstance(order_by, str):
+            sort_keys = [(order_by, ASCENDING)]
+        elif isinstance(order_by, dict):
+            sort_keys = list(order_by.items())
+        else:
+            sort_keys = [(field, direction) for field, direction in order_by]
+        if not any(field == "id" for field, _ in sort_keys):
+            # 使用 id 作为决胜字段，保证排序全局唯一
+            sort_keys.append(("id", sort_keys[-1][1] if sort_keys else ASCENDING))
+        return sort_keys
+
+    @staticmethod
+    def _build_keyset_filter(sort_keys, values):
+        clauses = []
+        for index, (field, direction) in enumerate(sort_keys):
+            clause = {prev_field: values[i] for i, (prev_field, _) in enumerate(sort_keys[:index])}
+            clause[field] = {"$gt" if direction == ASCENDING else "$lt": values[index]}
+            clauses.append(clause)
+        return {"$or": clauses}
+
+    @staticmethod
+    def _encode_keyset_token(sort_keys, document):
+        values = []
+        for field, _ in sort_keys:
+            value = document
+            for part in field.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            values.append(value)
+        payload = json_util.dumps({"k": [field for field, _ in sort_keys], "v": values})
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_keyset_token(token, sort_keys):
+        try:
+            payload = json_util.loads(base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8"))
+        except Exception:
+            raise ValueError("Invalid pagination token.")
+        if payload.get("k") != [field for field, _ in sort_keys]:
+            raise ValueError("Pagination token does not match order_by.")
+        return payload["v"]
+
     def _build_comparison_filters(self, comparisons):
         if not comparisons:
             return {}
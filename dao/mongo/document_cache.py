@@ -0,0 +1,135 @@
+import copy
+import bson
+from bson import json_util
+
+from common_sdk.logging.logger import logger
+from common_sdk.util.ttl_cache import TTLCache
+
+"""AsyncMongodbClientHelper.get 的读穿透文档缓存"""
+
+
+def make_query_key(db_name, coll_name, conditions, *extras):
+    """
+    生成查询的规范化缓存键。
+
+    顶层条件按字段名排序(顶层字段顺序不影响语义)，嵌套文档保持原顺序(子文档相等匹配与字段顺序有关)。
+    """
+    normalized = sorted((conditions or {}).items())
+    return db_name, coll_name, json_util.dumps([normalized, *extras])
+
+
+def _is_scalar_id(doc_id):
+    """只有标量 id 可以作为索引键，{"$in": [...]} 等操作符或数组条件不建立索引"""
+    return doc_id is not None and not isinstance(doc_id, (dict, list))
+
+
+class DocumentCache:
+    """
+    进程内 LRU+TTL 一级缓存，可选以 AsyncRedisStorage 作为多 worker 共享的二级缓存。
+
+    二级缓存只缓存形如 {"id": xxx} 的按 id 查询，失效时只需删除一个 key；
+    其他条件的查询只进入一级缓存，并按返回文档的 id 建立索引以便写入时失效。
+    文档以 bson.json_util 扩展 JSON 写入 Redis，datetime、ObjectId 等类型可以原样还原。
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024, ttl=60,
+                 redis_storage=None, redis_ttl=None, redis_prefix="mongo_doc_cache"):
+        self._local = TTLCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, on_evict=self._on_evict)
+        self._redis_storage = redis_storage
+        self._redis_ttl = redis_ttl or ttl
+        self._redis_prefix = redis_prefix
+        self._id_index = {}
+        self._generation = 0
+        self.redis_hits = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    async def get(self, db_name, coll_name, conditions, loader):
+        """
+        先查一级缓存，再查二级缓存，都未命中时调用 loader 读取 Mongo 并回填。
+
+        返回的文档是缓存内容的副本，调用方可以安全修改。
+        """
+        key = make_query_key(db_name, coll_name, conditions)
+        document = self._local.get(key)
+        if document is not None:
+            return copy.deepcopy(document)
+
+        generation = self._generation
+        redis_key = self._redis_key(db_name, coll_name, conditions)
+        if redis_key:
+            document = await self._redis_storage.get(redis_key)
+            if isinstance(document, str):
+                document = json_util.loads(document)
+            if document is not None:
+                self.redis_hits += 1
+                self._store(key, db_name, coll_name, conditions, document, generation)
+                return copy.deepcopy(document)
+
+        self.loads += 1
+        document = await loader()
+        if document is None:
+            return None
+        # 读取期间发生过写入时不回填，避免把旧数据写回缓存
+        if self._store(key, db_name, coll_name, conditions, document, generation) and redis_key:
+            await self._fill_redis(redis_key, document)
+        return copy.deepcopy(document)
+
+    async def invalidate(self, db_name, coll_name, doc_ids):
+        self._generation += 1
+        for doc_id in doc_ids:
+            if not _is_scalar_id(doc_id):
+                continue
+            self.invalidations += 1
+            for key in self._id_index.pop((db_name, coll_name, doc_id), ()):
+                self._local.delete(key)
+            redis_key = self._redis_key(db_name, coll_name, {"id": doc_id})
+            if redis_key:
+                await self._redis_storage.delete(redis_key)
+
+    def clear(self):
+        self._generation += 1
+        self._local.clear()
+        self._id_index.clear()
+
+    def stats(self):
+        return {
+            **self._local.stats(),
+            "redis_hits": self.redis_hits,
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+        }
+
+    def _store(self, key, db_name, coll_name, conditions, document, generation):
+        if generation != self._generation:
+            return False
+        self._local.set(key, document, size=len(bson.encode(document)))
+        doc_ids = {doc_id for doc_id in (document.get("id"), conditions.get("id")) if _is_scalar_id(doc_id)}
+        for doc_id in doc_ids:
+            self._id_index.setdefault((db_name, coll_name, doc_id), set()).add(key)
+        return True
+
+    def _redis_key(self, db_name, coll_name, conditions):
+        if self._redis_storage is None or list(conditions) != ["id"] or not _is_scalar_id(conditions["id"]):
+            return None
+        return f"{self._redis_prefix}:{db_name}:{coll_name}:{conditions['id']}"
+
+    def _on_evict(self, key, document):
+        db_name, coll_name, _ = key
+        doc_id = document.get("id")
+        if not _is_scalar_id(doc_id):
+            return
+        keys = self._id_index.get((db_name, coll_name, doc_id))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._id_index[(db_name, coll_name, doc_id)]
+
+    async def _fill_redis(self, redis_key, document):
+        """回填二级缓存，序列化或 Redis 写入失败时只记录日志，文档仍留在一级缓存"""
+        try:
+            await self._redis_storage.set(redis_key, json_util.dumps(document), expired=self._redis_ttl)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"文档无法序列化，跳过 Redis 缓存: {redis_key}, 错误={e}")
+        except Exception as e:
+            logger.error(f"回填 Redis 文档缓存失败: {redis_key}, 错误={e}")
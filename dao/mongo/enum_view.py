@@ -0,0 +1,188 @@
+import asyncio
+from bson import json_util
+from pymongo.errors import OperationFailure, PyMongoError
+
+from common_sdk.util import date_utils
+from common_sdk.logging.logger import logger
+
+"""get_enums 的增量物化视图，由 change stream 或 updateTime 轮询驱动"""
+
+# $changeStream 不可用的错误码: 13 为缺少 changeStream 权限，40573/40324 为集合不是副本集/分片集群
+_CHANGE_STREAM_UNSUPPORTED_CODES = {13, 40573, 40324}
+_MISSING = object()
+
+
+class EnumView:
+    """
+    在内存中维护 (集合, 分组字段, 条件) 的分组计数。
+
+    启动时全量加载一次，之后通过 change stream 增量更新；集合不支持 change stream 或没有权限时
+    退化为按 updateTime 轮询，并每隔 resync_interval 全量重建一次以感知删除。
+    """
+
+    def __init__(self, collection, fields, conditions=None, poll_interval=5, resync_interval=300, start_timeout=30):
+        if not fields:
+            raise ValueError("At least one field must be provided for grouping.")
+        self.collection = collection
+        self.fields = list(fields)
+        self.conditions = conditions or {}
+        self.poll_interval = poll_interval
+        self.resync_interval = resync_interval
+        self.start_timeout = start_timeout
+        self.mode = None  # change_stream / polling
+        self._members = {}  # _id -> 分组键
+        self._groups = {}  # 分组键 -> [字段值字典, 计数]
+        self._result = None
+        self._ready = asyncio.Event()
+        self._task = None
+        self._first_error = None  # 首次加载完成前遇到的第一个错误，启动超时时抛出
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    async def start(self):
+        """
+        启动后台同步任务，并等待首次全量加载完成。
+
+        超过 start_timeout 秒仍未完成(如持续连接失败)时停止同步任务，抛出期间遇到的第一个错误，避免阻塞应用启动。
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        ready = asyncio.create_task(self._ready.wait())
+        await asyncio.wait([ready, self._task], timeout=self.start_timeout, return_when=asyncio.FIRST_COMPLETED)
+        if ready.done():
+            return
+        ready.cancel()
+        if self._task.done():
+            self._task.result()
+        error = self._first_error
+        await self.close()
+        if error is not None:
+            raise error
+        raise TimeoutError(f"EnumView initial load timed out: {self.collection.full_name}")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def result(self):
+        """返回与 get_enums 相同结构的分组计数"""
+        if self._result is None:
+            self._result = [{**values, "count": count} for values, count in self._groups.values()]
+        return [dict(item) for item in self._result]
+
+    async def _run(self):
+        while True:
+            try:
+                self.mode = "change_stream"
+                await self._watch()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in _CHANGE_STREAM_UNSUPPORTED_CODES:
+                    logger.warning(f"集合 {self.collection.full_name} 不支持 change stream，改为轮询 updateTime")
+                    self.mode = "polling"
+                    await self._poll()
+                    return
+                self._record_error(e)
+            except PyMongoError as e:
+                self._record_error(e)
+            await asyncio.sleep(self.poll_interval)
+
+    def _record_error(self, error):
+        logger.error(f"EnumView change stream 异常，重新同步: {self.collection.full_name}, 错误={error}")
+        if not self.ready and self._first_error is None:
+            self._first_error = error
+
+    async def _watch(self):
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete", "invalidate"]}}}]
+        # 先打开 change stream 再全量加载，加载期间的变更会在之后重放，重放是幂等的
+        async with self.collection.watch(pipeline, full_document="updateLookup") as stream:
+            await self._load()
+            async for change in stream:
+                if change["operationType"] == "invalidate":
+                    return
+                await self._apply_change(change)
+
+    async def _poll(self):
+        await self._load()
+        watermark = date_utils.timestamp_second()
+        last_resync = watermark
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            now = date_utils.timestamp_second()
+            try:
+                if now - last_resync >= self.resync_interval:
+                    await self._load()
+                    last_resync = now
+                else:
+                    await self._apply_updated_since(watermark)
+                watermark = now
+            except PyMongoError as e:
+                logger.error(f"EnumView 轮询失败: {self.collection.full_name}, 错误={e}")
+
+    async def _load(self):
+        members, groups = {}, {}
+        async for document in self.collection.find(self.conditions, self._projection()):
+            key, values = self._group_key(document)
+            members[document["_id"]] = key
+            group = groups.setdefault(key, [values, 0])
+            group[1] += 1
+        self._members, self._groups, self._result = members, groups, None
+        self._ready.set()
+
+    async def _apply_change(self, change):
+        doc_id = change["documentKey"]["_id"]
+        document = change.get("fullDocument")
+        if change["operationType"] == "delete" or document is None:
+            self._set_member(doc_id, None)
+            return
+        if self.conditions:
+            # 条件可能任意复杂，由服务端按 _id 判断变更后的文档是否仍满足条件
+            document = await self.collection.find_one(
+                {"$and": [{"_id": doc_id}, self.conditions]}, self._projection()
+            )
+        self._set_member(doc_id, document)
+
+    async def _apply_updated_since(self, watermark):
+        changed = {"updateTime": {"$gte": watermark}}
+        matched = {}
+        query = {"$and": [changed, self.conditions]} if self.conditions else changed
+        async for document in self.collection.find(query, self._projection()):
+            matched[document["_id"]] = document
+        async for document in self.collection.find(changed, {"_id": 1}):
+            self._set_member(document["_id"], matched.get(document["_id"]))
+
+    def _set_member(self, doc_id, document):
+        old_key = self._members.pop(doc_id, None)
+        if old_key is not None:
+            group = self._groups[old_key]
+            group[1] -= 1
+            if group[1] <= 0:
+                del self._groups[old_key]
+        if document is not None:
+            key, values = self._group_key(document)
+            self._members[doc_id] = key
+            group = self._groups.setdefault(key, [values, 0])
+            group[1] += 1
+        self._result = None
+
+    def _group_key(self, document):
+        values = {}
+        for field in self.fields:
+            value = document
+            for part in field.split("."):
+                value = value.get(part, _MISSING) if isinstance(value, dict) else _MISSING
+            # 与 $group 一致，缺失的字段不出现在分组结果中
+            if value is not _MISSING:
+                values[field] = value
+        return json_util.dumps(values), values
+
+    def _projection(self):
+        return {field: 1 for field in self.fields}
@@ -0,0 +1,72 @@
+import time
+from collections import defaultdict, deque
+from pymongo.monitoring import ConnectionPoolListener
+
+from common_sdk.dao.pool_telemetry import PoolTelemetry
+
+"""pymongo 连接池事件监听，指标注册到 common_sdk.dao.pool_telemetry，通过 pool_stats() 查看"""
+
+
+class MongoPoolListener(ConnectionPoolListener):
+    """pymongo 连接池事件监听器，每个服务端地址注册一个名为 mongo:<host>:<port> 的 PoolTelemetry"""
+
+    def __init__(self, prefix="mongo"):
+        self.prefix = prefix
+        self._telemetries = {}
+        self._checkout_started = defaultdict(deque)
+
+    def telemetry(self, address):
+        telemetry = self._telemetries.get(address)
+        if telemetry is None:
+            host, port = address
+            telemetry = self._telemetries[address] = PoolTelemetry(f"{self.prefix}:{host}:{port}")
+        return telemetry
+
+    def pool_created(self, event):
+        self.telemetry(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.telemetry(event.address).connects += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.telemetry(event.address).closes += 1
+
+    def connection_check_out_started(self, event):
+        self._checkout_started[event.address].append(time.perf_counter())
+
+    def connection_check_out_failed(self, event):
+        telemetry = self.telemetry(event.address)
+        self._observe_wait(telemetry, event)
+        telemetry.checkout_failures += 1
+        if event.reason == "timeout":
+            telemetry.timeouts += 1
+
+    def connection_checked_out(self, event):
+        telemetry = self.telemetry(event.address)
+        self._observe_wait(telemetry, event)
+        telemetry.checkouts += 1
+
+    def connection_checked_in(self, event):
+        self.telemetry(event.address).checkins += 1
+
+    def _observe_wait(self, telemetry, event):
+        started = self._checkout_started[event.address]
+        start = started.popleft() if started else None
+        # pymongo 4.7+ 的事件自带 duration(秒)，更早的版本按同地址的开始事件先进先出近似计算
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            telemetry.observe_checkout(duration * 1000)
+        elif start is not None:
+            telemetry.observe_checkout((time.perf_counter() - start) * 1000)
@@ -0,0 +1,159 @@
+import asyncio
+import random
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+
+from common_sdk.logging.logger import logger
+
+"""Mongo 查询采样分析与索引建议"""
+
+_RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$exists", "$regex"}
+
+
+class QueryProfiler:
+    """
+    按 sample_rate 对查询采样并在后台执行 explain()，记录全表扫描(COLLSCAN)、内存排序(SORT)
+    以及扫描文档数/返回文档数的比例，并按 ESR(等值-排序-范围)规则给出复合索引建议。
+    """
+
+    def __init__(self, sample_rate=0.01, examined_ratio_threshold=10, max_shapes=1000):
+        """
+        Args:
+            sample_rate: 采样比例，0~1
+            examined_ratio_threshold: 扫描文档数/返回文档数超过该值时认为需要索引
+            max_shapes: 最多记录的查询形态数量
+        """
+        self.sample_rate = sample_rate
+        self.examined_ratio_threshold = examined_ratio_threshold
+        self.max_shapes = max_shapes
+        self._records = {}
+        self._tasks = set()
+
+    def observe(self, collection, matcher, order_by=None, limit=None):
+        """命中采样时在后台分析查询，不阻塞调用方"""
+        if random.random() >= self.sample_rate:
+            return
+        task = asyncio.create_task(self.profile(collection, matcher, order_by, limit))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def profile(self, collection, matcher, order_by=None, limit=None):
+        sort_keys = self._normalize_sort(order_by)
+        cursor = collection.find(matcher or {})
+        if sort_keys:
+            cursor = cursor.sort(sort_keys)
+        if limit:
+            cursor = cursor.limit(limit)
+        try:
+            explain = await cursor.explain()
+        except PyMongoError as e:
+            logger.warning(f"explain 执行失败: {collection.full_name}, 错误={e}")
+            return None
+        return self._record(collection, matcher or {}, sort_keys, explain)
+
+    def report(self):
+        """按扫描文档总数倒序返回各查询形态的统计"""
+        records = [dict(record) for record in self._records.values()]
+        return sorted(records, key=lambda record: record["docs_examined"], reverse=True)
+
+    def suggestions(self):
+        """返回需要索引的查询形态对应的索引建议，已去重"""
+        suggestions = {}
+        for record in self._records.values():
+            if not record["needs_index"] or not record["suggested_index"]:
+                continue
+            key = (record["db_name"], record["coll_name"], tuple(record["suggested_index"]))
+            suggestions[key] = {
+                "db_name": record["db_name"],
+                "coll_name": record["coll_name"],
+                "keys": record["suggested_index"],
+            }
+        return list(suggestions.values())
+
+    def reset(self):
+        self._records.clear()
+
+    def _record(self, collection, matcher, sort_keys, explain):
+        equality, ranges = self._classify_fields(matcher)
+        shape = (collection.full_name, tuple(equality), tuple(ranges), tuple(sort_keys))
+        record = self._records.get(shape)
+        if record is None:
+            if len(self._records) >= self.max_shapes:
+                return None
+            record = self._records[shape] = {
+                "db_name": collection.database.name,
+                "coll_name": collection.name,
+                "equality_fields": equality,
+                "range_fields": ranges,
+                "sort": sort_keys,
+                "samples": 0,
+                "collscan": 0,
+                "in_memory_sort": 0,
+                "docs_examined": 0,
+                "keys_examined": 0,
+                "returned": 0,
+                "max_time_ms": 0,
+                "examined_ratio": 0,
+                "needs_index": False,
+                "suggested_index": self._suggest_index(equality, sort_keys, ranges),
+            }
+
+        stages = self._collect_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        stats = explain.get("executionStats", {})
+        record["samples"] += 1
+        record["collscan"] += "COLLSCAN" in stages
+        record["in_memory_sort"] += "SORT" in stages
+        record["docs_examined"] += stats.get("totalDocsExamined", 0)
+        record["keys_examined"] += stats.get("totalKeysExamined", 0)
+        record["returned"] += stats.get("nReturned", 0)
+        record["max_time_ms"] = max(record["max_time_ms"], stats.get("executionTimeMillis", 0))
+        record["examined_ratio"] = round(record["docs_examined"] / max(record["returned"], 1), 2)
+        record["needs_index"] = bool(
+            record["collscan"] or record["in_memory_sort"]
+            or record["examined_ratio"] > self.examined_ratio_threshold
+        )
+        return record
+
+    @classmethod
+    def _collect_stages(cls, plan):
+        stages = set()
+        if isinstance(plan, dict):
+            if "stage" in plan:
+                stages.add(plan["stage"])
+            for key in ("queryPlan", "inputStage", "inputStages", "shards", "winningPlan"):
+                stages |= cls._collect_stages(plan.get(key))
+        elif isinstance(plan, list):
+            for item in plan:
+                stages |= cls._collect_stages(item)
+        return stages
+
+    @staticmethod
+    def _classify_fields(matcher):
+        equality, ranges = [], []
+        for field, value in matcher.items():
+            if field.startswith("$"):
+                # $and/$or 等组合条件无法直接推导索引，忽略
+                continue
+            if isinstance(value, dict) and any(op in _RANGE_OPERATORS for op in value):
+                ranges.append(field)
+            else:
+                equality.append(field)
+        return sorted(equality), sorted(ranges)
+
+    @staticmethod
+    def _suggest_index(equality, sort_keys, ranges):
+        keys = [(field, ASCENDING) for field in equality]
+        keys += [(field, direction) for field, direction in sort_keys if field not in equality]
+        used = {field for field, _ in keys}
+        keys += [(field, ASCENDING) for field in ranges if field not in used]
+        return keys
+
+    @staticmethod
+    def _normalize_sort(order_by):
+        if not order_by:
+            return []
+        if isinstance(order_by, str):
+            return [(order_by, ASCENDING)]
+        if isinstance(order_by, dict):
+            return list(order_by.items())
+        return [(field, direction) for field, direction in order_by]
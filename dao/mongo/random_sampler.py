@@ -0,0 +1,155 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from bson import ObjectId
+
+from common_sdk.dao.mongo.document_cache import make_query_key
+from common_sdk.logging.logger import logger
+
+"""大集合带条件随机取样，按集合统计信息在 $sample、_id 区间随机定位与预计算样本池之间选择"""
+
+
+class RandomSampler:
+    """
+    三种取样策略:
+      - sample: $match + $sample，无条件或小集合时使用(无条件时服务端走随机游标，代价很低)
+      - id_range: 在 _id 的最小/最大生成时间之间随机生成 ObjectId 并向后定位，适合条件命中率高的大集合，
+        结果近似随机(文档插入时间分布不均时会有偏差)，要求 _id 为 ObjectId
+      - reservoir: 后台定期以 $match + $sample 预计算一批命中条件的 _id，取样时从池中随机抽取后按 _id 回查，
+        适合条件选择性高的大集合
+    """
+    SAMPLE = "sample"
+    ID_RANGE = "id_range"
+    RESERVOIR = "reservoir"
+    AUTO = "auto"
+
+    def __init__(self, small_collection_threshold=100000, dense_selectivity=0.3, probe_size=200,
+                 reservoir_size=1000, refresh_interval=300, stats_ttl=600):
+        """
+        Args:
+            small_collection_threshold: 估算文档数不超过该值时直接使用 $sample
+            dense_selectivity: 条件命中率不低于该值时使用 id_range，否则使用 reservoir
+            probe_size: 估算条件命中率时随机抽取的文档数
+            reservoir_size: 样本池大小
+            refresh_interval: 样本池刷新间隔(秒)
+            stats_ttl: 集合统计信息缓存时间(秒)
+        """
+        self.small_collection_threshold = small_collection_threshold
+        self.dense_selectivity = dense_selectivity
+        self.probe_size = probe_size
+        self.reservoir_size = reservoir_size
+        self.refresh_interval = refresh_interval
+        self.stats_ttl = stats_ttl
+        self._stats = {}
+        self._reservoirs = {}
+        self._refreshing = {}
+
+    async def sample(self, collection, size=1, conditions=None, strategy=AUTO):
+        conditions = conditions or {}
+        if strategy == self.AUTO:
+            strategy = await self.choose_strategy(collection, size, conditions)
+        if strategy == self.ID_RANGE:
+            return await self._sample_by_id_range(collection, size, conditions)
+        if strategy == self.RESERVOIR:
+            return await self._sample_from_reservoir(collection, size, conditions)
+        return await self._sample(collection, size, conditions)
+
+    async def choose_strategy(self, collection, size, conditions):
+        if not conditions:
+            return self.SAMPLE
+        stats = await self._collection_stats(collection, conditions)
+        if stats["count"] <= self.small_collection_threshold or size >= stats["count"] * 0.05:
+            return self.SAMPLE
+        if stats["selectivity"] >= self.dense_selectivity and isinstance(stats["min_id"], ObjectId):
+            return self.ID_RANGE
+        return self.RESERVOIR
+
+    async def close(self):
+        tasks = list(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refreshing.clear()
+
+    async def _sample(self, collection, size, conditions):
+        pipeline = [{"$match": conditions}] if conditions else []
+        pipeline.append({"$sample": {"size": size}})
+        return [doc async for doc in collection.aggregate(pipeline)]
+
+    async def _sample_by_id_range(self, collection, size, conditions):
+        stats = await self._collection_stats(collection, conditions)
+        min_id, max_id = stats["min_id"], stats["max_id"]
+        if not isinstance(min_id, ObjectId) or not isinstance(max_id, ObjectId):
+            return await self._sample(collection, size, conditions)
+        start = min_id.generation_time.timestamp()
+        end = max_id.generation_time.timestamp()
+        conditions = conditions or {}
+        documents = {}
+        for _ in range(size * 3):
+            if len(documents) >= size:
+                break
+            pivot = ObjectId.from_datetime(datetime.fromtimestamp(random.uniform(start, end), tz=timezone.utc))
+            document = await collection.find_one({"$and": [conditions, {"_id": {"$gte": pivot}}]}, sort=[("_id", 1)])
+            if document is None:
+                document = await collection.find_one({"$and": [conditions, {"_id": {"$lt": pivot}}]}, sort=[("_id", -1)])
+            if document is None:
+                break
+            documents[document["_id"]] = document
+        return list(documents.values())
+
+    async def _sample_from_reservoir(self, collection, size, conditions):
+        key = make_query_key(collection.database.name, collection.name, conditions)
+        reservoir = self._reservoirs.get(key)
+        if reservoir is None:
+            reservoir = await self._refresh_reservoir(key, collection, conditions)
+        elif time.monotonic() - reservoir["refreshed_at"] >= self.refresh_interval and key not in self._refreshing:
+            task = asyncio.create_task(self._refresh_reservoir(key, collection, conditions))
+            self._refreshing[key] = task
+            task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+        ids = random.sample(reservoir["ids"], min(size, len(reservoir["ids"])))
+        if not ids:
+            return []
+        # 回查时再次校验条件，丢弃样本池刷新前已不满足条件或已删除的文档
+        cursor = collection.find({"$and": [conditions, {"_id": {"$in": ids}}]})
+        return await cursor.to_list(length=None)
+
+    async def _refresh_reservoir(self, key, collection, conditions):
+        pipeline = [
+            {"$match": conditions},
+            {"$sample": {"size": self.reservoir_size}},
+            {"$project": {"_id": 1}},
+        ]
+        try:
+            ids = [doc["_id"] async for doc in collection.aggregate(pipeline, allowDiskUse=True)]
+        except Exception as e:
+            logger.error(f"随机样本池刷新失败: {collection.full_name}, 错误={e}")
+            if key in self._reservoirs:
+                return self._reservoirs[key]
+            raise
+        reservoir = self._reservoirs[key] = {"ids": ids, "refreshed_at": time.monotonic()}
+        return reservoir
+
+    async def _collection_stats(self, collection, conditions):
+        key = make_query_key(collection.database.name, collection.name, conditions)
+        stats = self._stats.get(key)
+        if stats is not None and time.monotonic() - stats["updated_at"] < self.stats_ttl:
+            return stats
+        count = await collection.estimated_document_count()
+        selectivity = 1.0
+        if conditions and count > self.small_collection_threshold:
+            # 先 $sample 再 $match，服务端走随机游标，只读取 probe_size 个文档即可估算命中率
+            pipeline = [{"$sample": {"size": self.probe_size}}, {"$match": conditions}, {"$count": "matched"}]
+            result = await collection.aggregate(pipeline).to_list(length=None)
+            selectivity = (result[0]["matched"] if result else 0) / self.probe_size
+        min_doc = await collection.find_one({}, {"_id": 1}, sort=[("_id", 1)])
+        max_doc = await collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        stats = self._stats[key] = {
+            "count": count,
+            "selectivity": selectivity,
+            "min_id": min_doc["_id"] if min_doc else None,
+            "max_id": max_doc["_id"] if max_doc else None,
+            "updated_at": time.monotonic(),
+        }
+        return stats
+
@@ -1,67 +1,443 @@
 import asyncio
+import collections
+import contextlib
+import time
+from sqlalchemy import and_, bindparam, delete, func, insert, select, tuple_, update
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from contextlib import asynccontextmanager
 
+from common_sdk.dao.mysql.replica_router import Replica, ReplicaRouter
+from common_sdk.dao.pool_telemetry import instrument_sqlalchemy_engine
+
 """异步线程安全的 MySQL 客户端"""
 
+ModelMetadata = collections.namedtuple("ModelMetadata", ["columns", "primary_keys", "column_types"])
+
 
 class SingletonAsyncSQLAlchemyClientHelper:
     _instances = {}
     _lock = asyncio.Lock()
 
-    def __init__(self, db_url, pool_size=200, max_overflow=200, pool_recycle=300, pool_pre_ping=True):
+    def __init__(self, db_url, pool_size=200, max_overflow=200, pool_recycle=300, pool_pre_ping=True,
+                 query_cache_size=500):
         self.db_url = db_url
         self.pool_size = pool_size
         self.max_overflow = max_overflow
         self.pool_recycle = pool_recycle
         self.pool_pre_ping = pool_pre_ping
+        self.query_cache_size = query_cache_size
         self.engine = None
         self.async_session = None
+        self.replica_router = None
+        self.pool_telemetry = None
+        self.statement_profiler = None
 
     @classmethod
-    async def create(cls, db_url, pool_size=200, max_overflow=200, pool_recycle=300, pool_pre_ping=False):
+    async def create(cls, db_url, pool_size=200, max_overflow=200, pool_recycle=300, pool_pre_ping=False,
+                     query_cache_size=500, replica_urls=None, balancer="round_robin", max_replica_lag=None,
+                     health_check_interval=10, pool_telemetry=False, statement_profiler=None):
+        """
+        创建(或获取已创建的) db_url 对应的单例。
+
+        Args:
+            replica_urls: 从库连接串列表，get_session(readonly=True) 时路由到从库
+            balancer: 从库均衡策略 round_robin/least_inflight/latency_weighted，或自定义带 choose(replicas) 的对象
+            max_replica_lag: 复制延迟超过该秒数的从库不参与路由
+            health_check_interval: 从库健康检查(连通性/延迟/复制延迟)间隔秒数，为空时不检查
+            pool_telemetry: 为 True 时监控主库和从库连接池，通过 common_sdk.dao.pool_telemetry.pool_stats() 查看
+            statement_profiler: 可选的 StatementProfiler，开启后记录语句耗时、慢查询并在会话结束时输出统计
+        """
         async with cls._lock:
             if db_url in cls._instances:
                 return cls._instances[db_url]
             else:
-                instance = cls(db_url, pool_size, max_overflow, pool_recycle, pool_pre_ping)
-                instance.engine = create_async_engine(
-                    db_url,
-                    echo=False,
-                    pool_size=pool_size,
-                    max_overflow=max_overflow,
-                    pool_recycle=pool_recycle,
-                    pool_pre_ping=pool_pre_ping
-                )
+                instance = cls(db_url, pool_size, max_overflow, pool_recycle, pool_pre_ping, query_cache_size)
+                instance.engine = instance._create_engine(db_url)
+                if pool_telemetry:
+                    instance.pool_telemetry = instrument_sqlalchemy_engine(instance.engine)
+                if statement_profiler is not None:
+                    instance.statement_profiler = statement_profiler
+                    statement_profiler.instrument(instance.engine)
                 instance.async_session = async_sessionmaker(
                     bind=instance.engine, class_=AsyncSession, expire_on_commit=False
                 )
+                if replica_urls:
+                    replicas = []
+                    for replica_url in replica_urls:
+                        engine = instance._create_engine(replica_url)
+                        if statement_profiler is not None:
+                            statement_profiler.instrument(engine)
+                        replica = Replica(replica_url, engine, async_sessionmaker(
+                            bind=engine, class_=AsyncSession, expire_on_commit=False
+                        ))
+                        if pool_telemetry:
+                            replica.pool_telemetry = instrument_sqlalchemy_engine(engine)
+                        replicas.append(replica)
+                    instance.replica_router = ReplicaRouter(replicas, balancer, max_replica_lag)
+                    if health_check_interval:
+                        instance.replica_router.start_health_check(health_check_interval)
                 cls._instances[db_url] = instance
                 return instance
 
+    def _create_engine(self, db_url):
+        return create_async_engine(
+            db_url,
+            echo=False,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            pool_recycle=self.pool_recycle,
+            pool_pre_ping=self.pool_pre_ping,
+            query_cache_size=self.query_cache_size  # 编译语句缓存(LRU)容量
+        )
+
     @asynccontextmanager
-    async def get_session(self):
-        async with self.async_session() as session:
-            try:
-                yield session
-                await session.commit()
-            except Exception as e:
-                await session.rollback()
-                raise e
-            finally:
-                await session.close()
+    async def get_session(self, readonly=False):
+        """
+        获取事务会话，正常退出时提交，异常时回滚。
+
+        readonly 为 True 且配置了从库时路由到从库，没有可用从库或从库连接失败时回退主库。
+        """
+        session, replica = None, None
+        if readonly and self.replica_router is not None:
+            session, replica = await self._open_replica_session()
+        if session is None:
+            session = self.async_session()
+            if self.pool_telemetry is not None:
+                await self._checkout(session, self.pool_telemetry)
+        tracking = self.statement_profiler.track() if self.statement_profiler else contextlib.nullcontext()
+        async with session:
+            # 提交时 flush 的语句也计入会话统计
+            with tracking:
+                try:
+                    yield session
+                    await session.commit()
+                except Exception as e:
+                    await session.rollback()
+                    raise e
+                finally:
+                    if replica is not None:
+                        replica.inflight -= 1
+                    await session.close()
+
+    @staticmethod
+    async def _checkout(session, telemetry=None):
+        """提前为会话获取连接，传入 telemetry 时记录获取耗时、超时与失败次数；失败时关闭会话后抛出"""
+        start = time.perf_counter()
+        try:
+            await session.connection()
+        except Exception as e:
+            if telemetry is not None:
+                if isinstance(e, PoolTimeoutError):
+                    telemetry.timeouts += 1
+                else:
+                    telemetry.checkout_failures += 1
+            await session.close()
+            raise
+        if telemetry is not None:
+            telemetry.observe_checkout((time.perf_counter() - start) * 1000)
+
+    async def _open_replica_session(self):
+        replica = self.replica_router.choose()
+        if replica is None:
+            return None, None
+        session = replica.async_session()
+        try:
+            # 提前获取连接，连接失败时还能回退主库
+            await self._checkout(session, replica.pool_telemetry)
+        except Exception as e:
+            self.replica_router.mark_failed(replica, e)
+            return None, None
+        replica.inflight += 1
+        return session, replica
+
+    async def close(self):
+        """关闭主库和从库的连接池"""
+        if self.replica_router is not None:
+            await self.replica_router.close()
+        if self.engine is not None:
+            await self.engine.dispose()
 
 
 class AsyncSQLAlchemyClientHelper(SingletonAsyncSQLAlchemyClientHelper):
     _maximum_rows = 10000  # 行数限制
+    _dialect_inserts = {"mysql": mysql.insert, "mariadb": mysql.insert, "sqlite": sqlite.insert,
+                        "postgresql": postgresql.insert}
+    _model_metadata = {}  # model -> ModelMetadata
+    _statements = {}  # (model, kind) -> 参数化语句
 
-    @staticmethod
-    def filter_data_for_model(model, data):
-        model_columns = {column.name for column in model.__table__.columns}
+    @classmethod
+    def get_model_metadata(cls, model):
+        """返回模型的列名集合、主键列名和列类型，按模型缓存"""
+        metadata = cls._model_metadata.get(model)
+        if metadata is None:
+            table = model.__table__
+            metadata = cls._model_metadata[model] = ModelMetadata(
+                columns=frozenset(column.name for column in table.columns),
+                primary_keys=tuple(column.name for column in table.primary_key.columns),
+                column_types={column.name: column.type for column in table.columns},
+            )
+        return metadata
+
+    @classmethod
+    def filter_data_for_model(cls, model, data):
+        model_columns = cls.get_model_metadata(model).columns
         filtered_data = {key: value for key, value in data.items() if key in model_columns}
         return filtered_data
 
+    @classmethod
+    def get_statement(cls, model, kind):
+        """
+        返回按模型缓存的参数化语句，语句对象复用后 SQLAlchemy 的编译缓存可以直接命中，跳过重复编译。
+
+        kind:
+            select_by_pk: 按主键查询，参数为 pk_<主键列名>
+            insert: 插入，参数为列名，插入的列由参数决定
+            update_by_pk: 按主键更新，参数为 pk_<主键列名> 以及要更新的列名
+            delete_by_pk: 按主键删除，参数为 pk_<主键列名>
+        """
+        key = (model, kind)
+        statement = cls._statements.get(key)
+        if statement is not None:
+            return statement
+        table = model.__table__
+        pk_clause = and_(*(
+            table.c[name] == bindparam(f"pk_{name}") for name in cls.get_model_metadata(model).primary_keys
+        ))
+        if kind == "select_by_pk":
+            statement = select(model).where(pk_clause)
+        elif kind == "insert":
+            statement = insert(table)
+        elif kind == "update_by_pk":
+            statement = update(table).where(pk_clause)
+        elif kind == "delete_by_pk":
+            statement = delete(table).where(pk_clause)
+        else:
+            raise ValueError(f"Unknown statement kind: {kind}")
+        cls._statements[key] = statement
+        return statement
+
+    async def execute_statement(self, session, model, kind, params):
+        """执行 get_statement 返回的缓存语句，insert/update 的 params 会先按模型列过滤"""
+        if kind in ("insert", "update_by_pk"):
+            pk_params = {key: value for key, value in params.items() if key.startswith("pk_")}
+            params = {**self.filter_data_for_model(model, params), **pk_params}
+        return await session.execute(self.get_statement(model, kind), params)
+
     async def execute_query(self, session, query):
         """执行查询，限制返回结果的最大行数"""
         result = await session.execute(query.limit(self._maximum_rows))
         return result.fetchall()
+
+    async def stream_query(self, session, query, partition_size=1000, scalars=False):
+        """
+        以服务端游标流式读取查询结果，不受 _maximum_rows 限制。
+
+        每次只从数据库拉取 partition_size 行，内存占用与结果集大小无关，适合导出百万级数据。
+        MySQL 需要使用支持服务端游标的驱动(如 aiomysql/asyncmy)。
+
+        Args:
+            partition_size: 每批拉取的行数(yield_per)
+            scalars: 为 True 时返回每行的第一列(如 ORM 实体)，否则返回 Row
+        """
+        result = await session.stream(query.execution_options(yield_per=partition_size))
+        if scalars:
+            result = result.scalars()
+        try:
+            async for partition in result.partitions(partition_size):
+                for row in partition:
+                    yield row
+        finally:
+            await result.close()
+
+    async def paginate_keyset(self, session, query, order_cols, after=None, size=1000, descending=False):
+        """
+        基于游标(keyset)的分页，用排序列的值定位下一页，翻页代价与页码无关。
+
+        Args:
+            query: 未排序的 select 语句
+            order_cols: 排序列，组合后必须唯一(通常以主键结尾)，且必须是非空列:
+                NULL 与任何值比较的结果都是 NULL，遇到 NULL 值的行会导致分页提前结束
+            after: 上一页返回的 next_after，为空时从第一页开始
+            descending: 是否倒序
+
+        Returns:
+            (行列表, next_after)，没有下一页时 next_after 为 None
+        """
+        if after is not None:
+            if any(value is None for value in after):
+                raise ValueError("Keyset pagination requires non-null order column values.")
+            if len(order_cols) == 1:
+                key, value = order_cols[0], after[0]
+            else:
+                key, value = tuple_(*order_cols), tuple_(*after)
+            query = query.where(key < value if descending else key > value)
+        order = [column.desc() if descending else column.asc() for column in order_cols]
+        query = query.order_by(*order).limit(size + 1).execution_options(n_plus_one_check=False)
+        result = await session.execute(query)
+        rows = result.fetchall()
+        if len(rows) <= size:
+            return rows, None
+        rows = rows[:size]
+        next_after = tuple(self._row_value(rows[-1], column) for column in order_cols)
+        if any(value is None for value in next_after):
+            raise ValueError("Keyset pagination requires non-null order column values.")
+        return rows, next_after
+
+    async def parallel_scan(self, model, pk=None, partitions=8, concurrency=4, where=None, batch_size=1000):
+        """
+        按整数主键范围把表切分为 partitions 段，在 concurrency 个连接上并发读取，按批次返回 ORM 实体列表。
+
+        每段内部按主键 keyset 分批读取；配置了从库时读取走从库。批次之间的顺序不保证。
+
+        Args:
+            pk: 主键列名，默认使用模型的单列主键
+            where: 额外的过滤条件
+        """
+        pk = pk or self.get_model_metadata(model).primary_keys[0]
+        column = getattr(model, pk)
+        async with self.get_session(readonly=True) as session:
+            bounds_query = select(func.min(column), func.max(column))
+            if where is not None:
+                bounds_query = bounds_query.where(where)
+            low, high = (await session.execute(bounds_query)).one()
+        if low is None:
+            return
+        if not isinstance(low, int) or not isinstance(high, int):
+            raise ValueError("parallel_scan requires an integer primary key.")
+
+        step = max(-(-(high - low + 1) // partitions), 1)
+        ranges = [(start, min(start + step, high + 1)) for start in range(low, high + 1, step)]
+        semaphore = asyncio.Semaphore(concurrency)
+        queue = asyncio.Queue(maxsize=concurrency * 2)
+        done = object()
+
+        async def scan(start, end):
+            async with semaphore:
+                last = None
+                while True:
+                    query = select(model).where(column >= start, column < end)
+                    if where is not None:
+                        query = query.where(where)
+                    if last is not None:
+                        query = query.where(column > last)
+                    query = query.order_by(column).limit(batch_size).execution_options(n_plus_one_check=False)
+                    async with self.get_session(readonly=True) as session:
+                        result = await session.execute(query)
+                        batch = result.scalars().all()
+                    if batch:
+                        await queue.put(batch)
+                    if len(batch) < batch_size:
+                        return
+                    last = getattr(batch[-1], pk)
+
+        async def run():
+            tasks = [asyncio.create_task(scan(start, end)) for start, end in ranges]
+            try:
+                await asyncio.gather(*tasks)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await queue.put(done)
+                raise
+            else:
+                await queue.put(done)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        runner = asyncio.create_task(run())
+        try:
+            while True:
+                batch = await queue.get()
+                if batch is done:
+                    break
+                yield batch
+            await runner  # 抛出扫描过程中的异常
+        finally:
+            if not runner.done():
+                runner.cancel()
+                await asyncio.gather(runner, return_exceptions=True)
+
+    @staticmethod
+    def _row_value(row, column):
+        mapping = row._mapping
+        if column in mapping:
+            return mapping[column]
+        # select(Model) 时行内是 ORM 实体
+        return getattr(row[0], column.key)
+
+    async def bulk_insert(self, session, model, rows, chunk_size=1000):
+        """
+        分批以多行 INSERT 写入数据，每行先经过 filter_data_for_model 过滤。
+
+        Returns:
+            dict: 总行数、影响行数以及每个批次的行数/影响行数/耗时(毫秒)
+        """
+        return await self._bulk_write(session, model, rows, chunk_size, upsert=False)
+
+    async def bulk_upsert(self, session, model, rows, chunk_size=1000, update_columns=None):
+        """
+        分批以方言原生的多行 upsert 写入数据:
+        MySQL 使用 INSERT ... ON DUPLICATE KEY UPDATE，SQLite/PostgreSQL 使用 ON CONFLICT DO UPDATE(按主键冲突)。
+
+        Args:
+            update_columns: 冲突时更新的列，默认为行中除主键外的全部列
+
+        Returns:
+            dict: 同 bulk_insert
+        """
+        return await self._bulk_write(session, model, rows, chunk_size, upsert=True, update_columns=update_columns)
+
+    async def _bulk_write(self, session, model, rows, chunk_size, upsert, update_columns=None):
+        dialect = session.get_bind().dialect.name
+        dialect_insert = self._dialect_inserts.get(dialect)
+        if dialect_insert is None:
+            raise ValueError(f"Unsupported dialect for bulk write: {dialect}")
+        table = model.__table__
+        primary_keys = self.get_model_metadata(model).primary_keys
+        stats = {"rows": 0, "affected": 0, "chunks": []}
+
+        # 多行 VALUES 要求每行的列一致，列集合变化时切分新批次
+        for chunk in self._chunk_rows((self.filter_data_for_model(model, row) for row in rows), chunk_size):
+            statement = dialect_insert(table).values(chunk)
+            if upsert:
+                columns = update_columns or [key for key in chunk[0] if key not in primary_keys]
+                statement = self._build_upsert(statement, dialect, columns, primary_keys)
+            start = time.perf_counter()
+            result = await session.execute(statement)
+            stats["chunks"].append({
+                "rows": len(chunk),
+                "affected": result.rowcount,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+            })
+            stats["rows"] += len(chunk)
+            stats["affected"] += max(result.rowcount, 0)
+        return stats
+
+    @staticmethod
+    def _build_upsert(statement, dialect, columns, primary_keys):
+        if dialect in ("mysql", "mariadb"):
+            if not columns:
+                return statement.prefix_with("IGNORE")
+            return statement.on_duplicate_key_update({column: statement.inserted[column] for column in columns})
+        if not columns:
+            return statement.on_conflict_do_nothing(index_elements=primary_keys)
+        return statement.on_conflict_do_update(
+            index_elements=primary_keys, set_={column: statement.excluded[column] for column in columns}
+        )
+
+    @staticmethod
+    def _chunk_rows(rows, chunk_size):
+        chunk, keys = [], None
+        for row in rows:
+            if not row:
+                continue
+            if chunk and (len(chunk) >= chunk_size or row.keys() != keys):
+                yield chunk
+                chunk = []
+            chunk.append(row)
+            keys = row.keys()
+        if chunk:
+            yield chunk
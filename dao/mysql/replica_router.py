@@ -0,0 +1,154 @@
+import asyncio
+import itertools
+import random
+import time
+from sqlalchemy import text
+
+from common_sdk.logging.logger import logger
+
+"""只读会话的从库路由与负载均衡"""
+
+
+class Replica:
+    def __init__(self, url, engine, async_session):
+        self.url = url
+        self.engine = engine
+        self.async_session = async_session
+        self.inflight = 0
+        self.latency_ms = None  # 健康检查延迟的指数加权平均
+        self.lag = None  # 复制延迟(秒)，无法获取时为 None
+        self.replication_stopped = False  # 有复制状态但延迟为 NULL，即复制线程已停止或中断
+        self.healthy = True
+        self.failed_at = None
+        self.pool_telemetry = None  # 开启连接池监控时为该从库引擎的 PoolTelemetry
+
+    def stats(self):
+        return {
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "inflight": self.inflight,
+            "latency_ms": self.latency_ms,
+            "lag": self.lag,
+            "replication_stopped": self.replication_stopped,
+            "healthy": self.healthy,
+        }
+
+
+class RoundRobinPolicy:
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def choose(self, replicas):
+        return replicas[next(self._counter) % len(replicas)]
+
+
+class LeastInflightPolicy:
+    def choose(self, replicas):
+        return min(replicas, key=lambda replica: replica.inflight)
+
+
+class LatencyWeightedPolicy:
+    """按健康检查延迟的倒数加权随机选择，尚无延迟数据的从库按 1ms 计"""
+
+    def choose(self, replicas):
+        weights = [1 / max(replica.latency_ms or 1, 0.1) for replica in replicas]
+        return random.choices(replicas, weights=weights)[0]
+
+
+BALANCING_POLICIES = {
+    "round_robin": RoundRobinPolicy,
+    "least_inflight": LeastInflightPolicy,
+    "latency_weighted": LatencyWeightedPolicy,
+}
+
+
+class ReplicaRouter:
+    """
+    在健康且复制延迟不超过 max_lag 的从库中按均衡策略选择，没有可用从库时返回 None 由调用方回退主库。
+    连接失败的从库在 retry_interval 秒内不再参与路由，之后由健康检查恢复。
+    """
+
+    def __init__(self, replicas, policy="round_robin", max_lag=None, retry_interval=30):
+        self.replicas = replicas
+        self.policy = BALANCING_POLICIES[policy]() if isinstance(policy, str) else policy
+        self.max_lag = max_lag
+        self.retry_interval = retry_interval
+        self._health_check_task = None
+
+    def choose(self):
+        candidates = [replica for replica in self.replicas if self._available(replica)]
+        if not candidates:
+            return None
+        return self.policy.choose(candidates)
+
+    def mark_failed(self, replica, error):
+        replica.healthy = False
+        replica.failed_at = time.monotonic()
+        logger.warning(f"从库不可用，回退主库: {replica.stats()['url']}, 错误={error}")
+
+    async def check(self):
+        """检查每个从库的连通性、延迟和复制延迟"""
+        for replica in self.replicas:
+            start = time.perf_counter()
+            try:
+                async with replica.engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+                    elapsed = (time.perf_counter() - start) * 1000
+                    replica.lag, replica.replication_stopped = await self._replication_status(connection)
+            except Exception as e:
+                if replica.healthy:
+                    self.mark_failed(replica, e)
+                continue
+            replica.latency_ms = elapsed if replica.latency_ms is None else replica.latency_ms * 0.8 + elapsed * 0.2
+            replica.healthy = True
+
+    def start_health_check(self, interval=10):
+        if self._health_check_task is None:
+            self._health_check_task = asyncio.create_task(self._health_check_loop(interval))
+
+    async def close(self):
+        if self._health_check_task is not None:
+            self._health_check_task.cancel()
+            try:
+                await self._health_check_task
+            except asyncio.CancelledError:
+                pass
+            self._health_check_task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self):
+        return [replica.stats() for replica in self.replicas]
+
+    def _available(self, replica):
+        if not replica.healthy and time.monotonic() - replica.failed_at < self.retry_interval:
+            return False
+        if self.max_lag is not None:
+            # 复制停止时数据可能任意陈旧，与超过延迟阈值同样处理
+            if replica.replication_stopped or (replica.lag is not None and replica.lag > self.max_lag):
+                return False
+        return True
+
+    async def _health_check_loop(self, interval):
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"从库健康检查异常: {e}")
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    async def _replication_status(connection):
+        """返回 (复制延迟秒数, 复制是否已停止)，非 MySQL 或查询不到复制状态时为 (None, False)"""
+        if connection.dialect.name not in ("mysql", "mariadb"):
+            return None, False
+        for statement, column in (("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+                                  ("SHOW SLAVE STATUS", "Seconds_Behind_Master")):
+            try:
+                row = (await connection.exec_driver_sql(statement)).mappings().first()
+            except Exception:
+                continue
+            if not row:
+                return None, False
+            lag = row.get(column)
+            return lag, lag is None
+        return None, False
@@ -0,0 +1,115 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+
+from common_sdk.logging.logger import logger
+
+"""SQL 语句级耗时统计、慢查询日志与会话内 N+1 检测"""
+
+_session_stats: ContextVar = ContextVar("sqlalchemy_session_stats", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+# 只折叠 IN 后面的参数列表，(a, b) > (?, ?) 这类行值比较保持原样；多列 IN 保留元组的列数
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_IN_TUPLE_LIST = re.compile(r"\bIN\s*\(\s*(\(\?(?:\s*,\s*\?)*\))(?:\s*,\s*\1)+\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+_SELECT = re.compile(r"\s*(?:SELECT|WITH)\b", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"VALUES\s*(\(\?(?:\s*,\s*\?)*\))(?:\s*,\s*\1)+", re.IGNORECASE)
+
+# 日志中语句的最大长度，批量 INSERT 等长语句截断输出
+MAX_LOGGED_STATEMENT_LENGTH = 500
+
+
+def statement_shape(statement):
+    """把语句归一化为形态: 去掉字面量、折叠 IN 列表、批量 VALUES 和空白，参数不同的同一语句得到相同形态"""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = re.sub(r"%\(\w+\)s|%s|:\w+", "?", shape)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    shape = _IN_TUPLE_LIST.sub(r"IN (\1)", shape)
+    shape = _VALUES_LIST.sub(r"VALUES \1, ...", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def _truncate(statement):
+    if len(statement) <= MAX_LOGGED_STATEMENT_LENGTH:
+        return statement
+    return f"{statement[:MAX_LOGGED_STATEMENT_LENGTH]}...({len(statement)} chars)"
+
+
+class SessionStatementStats:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement = None
+        self.shapes = Counter()
+
+    def record(self, statement, elapsed_ms, n_plus_one_check=True):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_statement = statement
+        # N+1 只针对逐条发出的查询，批量写入等重复语句是预期行为
+        if n_plus_one_check and _SELECT.match(statement):
+            self.shapes[statement_shape(statement)] += 1
+
+
+class StatementProfiler:
+    """
+    通过 before_cursor_execute/after_cursor_execute 事件记录每条语句的耗时。
+
+    在 track() 范围内(get_session 会自动进入)执行的语句归入当前会话统计，
+    会话结束时输出语句数、数据库总耗时和最慢语句，同一形态的 SELECT 重复执行达到阈值时告警为疑似 N+1。
+    有意分批执行的查询(如 paginate_keyset、parallel_scan)通过 execution_options(n_plus_one_check=False) 排除在 N+1 检测之外。
+    日志通过项目 logger 输出，自动带上上下文中的 message UUID。
+    """
+
+    def __init__(self, slow_threshold_ms=200, n_plus_one_threshold=5, log_summary=True):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.log_summary = log_summary
+
+    def instrument(self, engine):
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    @contextmanager
+    def track(self):
+        stats = SessionStatementStats()
+        token = _session_stats.set(stats)
+        try:
+            yield stats
+        finally:
+            _session_stats.reset(token)
+            self._report(stats)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["statement_start_time"].pop()) * 1000
+        if elapsed_ms >= self.slow_threshold_ms:
+            logger.warning(f"慢SQL {elapsed_ms:.1f}ms: {_truncate(statement)}")
+        stats = _session_stats.get()
+        if stats is not None:
+            n_plus_one_check = context is None or context.execution_options.get("n_plus_one_check", True)
+            stats.record(statement, elapsed_ms, n_plus_one_check)
+
+    def _report(self, stats):
+        if not stats.count:
+            return
+        for shape, count in stats.shapes.items():
+            if count >= self.n_plus_one_threshold:
+                logger.warning(f"疑似 N+1 查询: 同一会话内执行 {count} 次: {shape}")
+        if self.log_summary:
+            logger.info(
+                f"会话SQL统计: 语句数={stats.count}, 数据库总耗时={stats.total_ms:.1f}ms, "
+                f"最慢={stats.slowest_ms:.1f}ms: {_truncate(statement_shape(stats.slowest_statement))}"
+            )
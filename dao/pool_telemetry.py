@@ -0,0 +1,212 @@
+import asyncio
+import bisect
+
+from common_sdk.logging.logger import logger
+
+"""
+SQLAlchemy/Mongo 连接池监控: 获取连接耗时直方图、使用中/空闲连接数、溢出与超时计数，以及可选的自适应扩缩容。
+
+本模块被 MySQL 与 Mongo 两个 DAO 共用，不在模块级导入任何数据库驱动；Mongo 的监听器见 dao.mongo.pool_listener。
+"""
+
+_registry = {}
+
+
+def pool_stats():
+    """返回所有已注册连接池的监控快照，key 为连接池名称"""
+    return {name: telemetry.snapshot() for name, telemetry in _registry.items()}
+
+
+def get_telemetry(name):
+    return _registry.get(name)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets_ms=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)  # 最后一个桶为 +Inf
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms):
+        self.counts[bisect.bisect_left(self.buckets_ms, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, percent):
+        """按桶上界估算分位数"""
+        if not self.count:
+            return 0
+        threshold = self.count * percent / 100
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= threshold:
+                return self.buckets_ms[index] if index < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self):
+        labels = [f"le_{bucket}" for bucket in self.buckets_ms] + ["le_inf"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class PoolTelemetry:
+    def __init__(self, name, gauges=None):
+        """
+        Args:
+            name: 连接池名称
+            gauges: 返回实时 in_use/idle 等指标的函数，为空时使用事件计数推算
+        """
+        self.name = name
+        self.checkout_latency = LatencyHistogram()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.closes = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.checkout_failures = 0
+        self._gauges = gauges
+        _registry[name] = self
+
+    def observe_checkout(self, elapsed_ms):
+        self.checkout_latency.observe(elapsed_ms)
+
+    def snapshot(self):
+        gauges = self._gauges() if self._gauges else {
+            "in_use": self.checkouts - self.checkins,
+            "idle": max(self.connects - self.closes - (self.checkouts - self.checkins), 0),
+        }
+        return {
+            **gauges,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "closes": self.closes,
+            "overflow_events": self.overflow_events,
+            "timeouts": self.timeouts,
+            "checkout_failures": self.checkout_failures,
+            "checkout_latency": self.checkout_latency.snapshot(),
+        }
+
+
+def instrument_sqlalchemy_engine(engine, name=None):
+    """
+    通过 SQLAlchemy 连接池事件监控引擎的连接池，返回 PoolTelemetry。
+
+    连接池事件没有"开始等待连接"的时点，获取连接耗时由 get_session 在取连接时调用 observe_checkout 记录。
+    """
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+    name = name or f"sqlalchemy:{sync_engine.url.render_as_string(hide_password=True)}"
+
+    def gauges():
+        if not hasattr(pool, "checkedout"):
+            # StaticPool/NullPool 等没有计数接口
+            return {"status": pool.status()}
+        return {
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": getattr(pool, "_max_overflow", None),
+        }
+
+    telemetry = PoolTelemetry(name, gauges=gauges)
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        telemetry.connects += 1
+
+    @event.listens_for(sync_engine, "close")
+    def on_close(dbapi_connection, connection_record):
+        telemetry.closes += 1
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        telemetry.checkouts += 1
+        if hasattr(pool, "overflow") and pool.overflow() > 0:
+            telemetry.overflow_events += 1
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        telemetry.checkins += 1
+
+    return telemetry
+
+
+class AdaptivePoolSizer:
+    """
+    根据获取连接的 p95 耗时和超时次数调整 SQLAlchemy QueuePool 的 max_overflow。
+
+    QueuePool 的常驻连接数 pool_size 无法在运行中修改，max_overflow 是唯一可在线调整的上限；
+    Mongo 客户端的连接池上限在创建时固定，因此只对 SQLAlchemy 引擎生效。
+    """
+
+    def __init__(self, engine, telemetry, min_overflow=0, max_overflow=400, target_p95_ms=10, step=10,
+                 interval=30):
+        self.pool = getattr(engine, "sync_engine", engine).pool
+        self.telemetry = telemetry
+        self.min_overflow = min_overflow
+        self.max_overflow = max_overflow
+        self.target_p95_ms = target_p95_ms
+        self.step = step
+        self.interval = interval
+        self._last_timeouts = telemetry.timeouts
+        self._last_counts = list(telemetry.checkout_latency.counts)
+        self._task = None
+
+    def adjust(self):
+        """根据上一个周期的数据调整一次，返回调整后的 max_overflow"""
+        histogram = self.telemetry.checkout_latency
+        window = LatencyHistogram(histogram.buckets_ms)
+        window.counts = [now - last for now, last in zip(histogram.counts, self._last_counts)]
+        window.count = sum(window.counts)
+        window.max_ms = histogram.max_ms
+        self._last_counts = list(histogram.counts)
+        timeouts, self._last_timeouts = self.telemetry.timeouts - self._last_timeouts, self.telemetry.timeouts
+
+        current = self.pool._max_overflow
+        if timeouts or window.percentile(95) > self.target_p95_ms:
+            target = min(current + self.step, self.max_overflow)
+        elif window.count and self.pool.overflow() <= 0:
+            target = max(current - self.step, self.min_overflow)
+        else:
+            target = current
+        if target != current:
+            self.pool._max_overflow = target
+            logger.info(f"连接池 {self.telemetry.name} max_overflow 调整: {current} -> {target}")
+        return target
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.adjust()
+            except Exception as e:
+                logger.error(f"连接池自适应调整失败: {self.telemetry.name}, 错误={e}")
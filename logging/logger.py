@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 
-import logging, sys
-from logging.handlers import SysLogHandler
+import atexit, logging, queue, sys
+from logging.handlers import QueueHandler, QueueListener, SysLogHandler
 from uuid import uuid1
 from typing import Optional
 
@@ -24,6 +24,9 @@ class LoggerConfig:
         file_directory: Optional[str] = None,
         file_categories: Optional[str] = "ERROR,WARNING",
         log_level: int = logging.INFO,
+        enable_queue: bool = False,
+        queue_size: int = 10000,
+        queue_policy: str = "drop",
     ):
         self.app_name = app_name
         self.logger_category = logger_category
@@ -36,6 +39,31 @@ class LoggerConfig:
         self.file_directory = file_directory
         self.file_categories = file_categories
         self.log_level = log_level
+        # 开启后日志记录先写入有界队列，由后台线程写控制台/文件/syslog，调用方不等待 I/O
+        self.enable_queue = enable_queue
+        self.queue_size = queue_size
+        # 队列满时的策略: drop 丢弃并计数，block 阻塞调用方直到有空位
+        self.queue_policy = queue_policy
+
+
+class BoundedQueueHandler(QueueHandler):
+    """写入有界队列的 QueueHandler，队列满时按策略丢弃(计数)或阻塞"""
+
+    def __init__(self, log_queue: queue.Queue, policy: str = "drop"):
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unsupported log queue policy: {policy}")
+        super().__init__(log_queue)
+        self.policy = policy
+        self.dropped = 0
+
+    def enqueue(self, record):
+        if self.policy == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
 
 class Logger(metaclass=SingletonMetaclass):
@@ -47,6 +75,9 @@ class Logger(metaclass=SingletonMetaclass):
         self.__init_syslog_handler()
         self.__init_console_handler()
         self.__init_file_handler()
+        self._queue_handler = None
+        self._queue_listener = None
+        self.__init_queue_handler()
         self.logger.info(self.__wrap_message_with_uuid(f"########日志类初始化#######"))
 
     @property
@@ -123,6 +154,30 @@ class Logger(metaclass=SingletonMetaclass):
             target_logger.addHandler(handler)
         target_logger.propagate = False  # 防止重复输出
 
+    def queue_stats(self):
+        """队列模式下的队列长度与丢弃计数，未开启队列模式时返回 None"""
+        if self._queue_handler is None:
+            return None
+        return {
+            "size": self._queue_handler.queue.qsize(),
+            "capacity": self._queue_handler.queue.maxsize,
+            "policy": self._queue_handler.policy,
+            "dropped": self._queue_handler.dropped,
+        }
+
+    def stop_queue(self):
+        """停止后台写日志线程并写出队列中剩余的记录，进程退出时自动调用"""
+        if self._queue_listener is None:
+            return
+        listener, self._queue_listener = self._queue_listener, None
+        listener.stop()
+        self._logger.removeHandler(self._queue_handler)
+        for handler in listener.handlers:
+            self._logger.addHandler(handler)
+        if self._queue_handler.dropped:
+            sys.stderr.write(f"{self.name} 日志队列已满，共丢弃 {self._queue_handler.dropped} 条日志\n")
+        self._queue_handler = None
+
     def __wrap_message_with_uuid(self, message):
         message = str(message).replace('|', '').replace('\r', ' ').replace('\n', ' ')
         if self.message_uuid:
@@ -160,5 +215,18 @@ class Logger(metaclass=SingletonMetaclass):
             handler.setFormatter(self.formatter)
             self._logger.addHandler(handler)
 
+    def __init_queue_handler(self):
+        if str(self.config.enable_queue).lower() != 'true':
+            return
+        handlers = list(self._logger.handlers)
+        log_queue = queue.Queue(maxsize=int(self.config.queue_size))
+        self._queue_handler = BoundedQueueHandler(log_queue, policy=self.config.queue_policy)
+        self._queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        for handler in handlers:
+            self._logger.removeHandler(handler)
+        self._logger.addHandler(self._queue_handler)
+        self._queue_listener.start()
+        atexit.register(self.stop_queue)
+
 
 logger = Logger(LoggerConfig(**settings.LOGGING_CONFIG))
\ No newline at end of file
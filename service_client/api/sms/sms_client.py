@@ -3,11 +3,16 @@ from tencentcloud.common import credential
 from tencentcloud.sms.v20210111 import sms_client, models
 from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
 
+from common_sdk.base_class.lazy_proxy import LazyProxy
 from common_sdk.system.sys_env import get_env
 
 
 class TencentSMSClient:
-    def __init__(self):
+    def __init__(self, rate_limiter=None):
+        """
+        Args:
+            rate_limiter: 可选的限流器(见 util.redis_rate_limiter)，每次发送前获取一个令牌
+        """
         secret_id = get_env('TENCENT_SMS_SECRET_ID')
         secret_key = get_env('TENCENT_SMS_SECRET_KEY')
         region = get_env('TENCENT_SMS_REGION')
@@ -24,9 +29,12 @@ class TencentSMSClient:
         self.req = models.SendSmsRequest()
         self.req.SmsSdkAppId = sms_sdk_appid
         self.req.SignName = sign_name
+        self.rate_limiter = rate_limiter
 
     async def send_sms(self, phone_number, template_id, template_params=None):
         try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
             self.req.TemplateId = template_id
             self.req.PhoneNumberSet = [phone_number]
             if template_params:
@@ -42,5 +50,6 @@ class TencentSMSClient:
             return {"error": str(err)}
 
 
-tencent_sms_client = TencentSMSClient()
+# 首次使用时才读取环境变量并创建 SDK 客户端
+tencent_sms_client: TencentSMSClient = LazyProxy(TencentSMSClient)
 
@@ -12,7 +12,8 @@ class OSSClient:
                  access_key_id: str = None,
                  access_key_secret: str = None,
                  endpoint: str = None,
-                 bucket_name: str = None):
+                 bucket_name: str = None,
+                 rate_limiter=None):
         """
         初始化OSS客户端
 
@@ -21,6 +22,7 @@ class OSSClient:
             access_key_secret: 访问密钥，如果为None则从环境变量获取
             endpoint: OSS端点
             bucket_name: 存储桶名称
+            rate_limiter: 可选的限流器(见 util.redis_rate_limiter)，每次调用 OSS 接口前获取一个令牌
         """
         self.access_key_id = access_key_id or os.getenv('OSS_ACCESS_KEY_ID')
         self.access_key_secret = access_key_secret or os.getenv('OSS_ACCESS_KEY_SECRET')
@@ -38,6 +40,11 @@ class OSSClient:
 
         # 创建线程池用于异步执行
         self.executor = ThreadPoolExecutor(max_workers=4)
+        self.rate_limiter = rate_limiter
+
+    async def _throttle(self):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
 
     async def upload_file(self, object_name: str, file_data: Union[bytes, BinaryIO, str]) -> bool:
         """
@@ -55,6 +62,7 @@ class OSSClient:
                 result = self.bucket.put_object(object_name, file_data)
                 return result
 
+            await self._throttle()
             # 在线程池中执行同步操作
             result = await asyncio.get_event_loop().run_in_executor(
                 self.executor, _upload
@@ -82,6 +90,7 @@ class OSSClient:
                 result = self.bucket.get_object(object_name)
                 return result.read()
 
+            await self._throttle()
             content = await asyncio.get_event_loop().run_in_executor(
                 self.executor, _download
             )
@@ -108,6 +117,7 @@ class OSSClient:
                 result = self.bucket.delete_object(object_name)
                 return result
 
+            await self._throttle()
             result = await asyncio.get_event_loop().run_in_executor(
                 self.executor, _delete
             )
@@ -144,6 +154,7 @@ class OSSClient:
                     result = self.bucket.put_object(folder_name, '')
                     return result.status == 200
 
+            await self._throttle()
             success = await asyncio.get_event_loop().run_in_executor(
                 self.executor, _check_and_create
             )
@@ -179,6 +190,7 @@ class OSSClient:
                     })
                 return objects
 
+            await self._throttle()
             objects = await asyncio.get_event_loop().run_in_executor(
                 self.executor, _list
             )
@@ -208,6 +220,7 @@ class OSSClient:
                 except oss2.exceptions.NoSuchKey:
                     return False
 
+            await self._throttle()
             exists = await asyncio.get_event_loop().run_in_executor(
                 self.executor, _exists
             )
@@ -18,17 +18,20 @@ class MojiWeatherClient:
         path: API路径
         app_code: 授权AppCode
         token: API访问令牌
+        rate_limiter: 可选的限流器，每次请求前获取一个令牌
     """
-    def __init__(self, app_code):
+    def __init__(self, app_code, rate_limiter=None):
         """初始化墨迹天气API客户端。
 
         Args:
             app_code: 阿里云市场授权的AppCode
             token: API访问令牌，默认使用通用令牌
+            rate_limiter: 可选的限流器(见 util.redis_rate_limiter)，用于遵守上游的调用频率限制
         """
         self.host = "http://aliv8.data.moji.com"
         self.path = "/whapi/json/aliweather/condition"
         self.app_code = app_code
+        self.rate_limiter = rate_limiter
 
     async def _request(self, params: Dict[str, Any], path: Optional[str] = None) -> Dict[str, Any]:
         """发送异步请求到墨迹天气API。
@@ -53,6 +56,8 @@ class MojiWeatherClient:
         # 添加通用参数
 
         try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
             logger.info(f"墨迹天气API请求: URL={url}, headers={headers},参数={params}")
 
             async with httpx.AsyncClient() as client:
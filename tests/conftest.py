@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+"""
+仓库根目录即 common_sdk 包，测试时按 common_sdk 名称挂到临时目录下；宿主项目提供的 config.settings 缺失时补一个最小配置。
+
+标记为 benchmark 的性能基准默认跳过，设置 COMMON_SDK_BENCHMARK=1 时运行，结果输出到终端:
+    COMMON_SDK_BENCHMARK=1 python -m pytest tests -m benchmark
+需要 MongoDB 的基准通过 COMMON_SDK_BENCHMARK_MONGODB_URL 指定测试用的 mongod(会创建并删除 benchmark 库)。
+"""
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SDK_PATH = tempfile.mkdtemp(prefix="common_sdk_tests_")
+
+_benchmark_reports = []
+
+
+def _mount_sdk(root):
+    package = os.path.join(root, "common_sdk")
+    os.mkdir(package)
+    for name in os.listdir(REPO_ROOT):
+        if name != "config":
+            os.symlink(os.path.join(REPO_ROOT, name), os.path.join(package, name))
+    config = os.path.join(package, "config")
+    if os.path.exists(os.path.join(REPO_ROOT, "config", "settings.py")):
+        os.symlink(os.path.join(REPO_ROOT, "config"), config)
+    else:
+        os.mkdir(config)
+        with open(os.path.join(config, "settings.py"), "w") as f:
+            f.write("LOGGING_CONFIG = {}\n")
+
+
+_mount_sdk(SDK_PATH)
+sys.path.insert(0, SDK_PATH)
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: 性能基准，设置 COMMON_SDK_BENCHMARK=1 时才运行")
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get("COMMON_SDK_BENCHMARK") == "1":
+        return
+    skip = pytest.mark.skip(reason="benchmark, set COMMON_SDK_BENCHMARK=1 to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def benchmark_report():
+    """返回 report(title, rows) 函数，基准结果(字典列表)在测试结束后按表格输出到终端"""
+
+    def report(title, rows):
+        columns = list(rows[0])
+        cells = [[_format_cell(row[column]) for column in columns] for row in rows]
+        widths = [max(len(column), *(len(cell[index]) for cell in cells)) for index, column in enumerate(columns)]
+        lines = [f"== {title} ==", "  ".join(column.rjust(width) for column, width in zip(columns, widths))]
+        lines += ["  ".join(cell.rjust(width) for cell, width in zip(cell_row, widths)) for cell_row in cells]
+        _benchmark_reports.append(lines)
+
+    return report
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _benchmark_reports:
+        terminalreporter.section("benchmark")
+        for lines in _benchmark_reports:
+            for line in lines:
+                terminalreporter.write_line(line)
+            terminalreporter.write_line("")
+
+
+def _format_cell(value):
+    return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+
+@pytest.fixture(scope="session")
+def mongo_url():
+    url = os.environ.get("COMMON_SDK_BENCHMARK_MONGODB_URL")
+    if not url:
+        pytest.skip("set COMMON_SDK_BENCHMARK_MONGODB_URL to run MongoDB benchmarks")
+    return url
+
+
+@pytest.fixture(scope="session")
+def benchmark_scales():
+    """返回 scales(default) 函数: 基准的数据规模，COMMON_SDK_BENCHMARK_DOCS 可以指定逗号分隔的多个规模，如 1000000,10000000"""
+    value = os.environ.get("COMMON_SDK_BENCHMARK_DOCS")
+
+    def scales(default):
+        return [int(item) for item in value.split(",")] if value else list(default)
+
+    return scales
+
+
+@pytest.fixture(scope="session")
+def sdk_path():
+    return SDK_PATH
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(SDK_PATH, ignore_errors=True)
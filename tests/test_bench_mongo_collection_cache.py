@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("pytz")
+
+from common_sdk.dao.mongo.dao_helper import SingletonAsyncMongodbClientHelper
+
+"""基准: 1000 个并发协程下 get_collection 的单次调用开销，对比每次都竞争类锁的旧实现"""
+
+CONNECT_URL = "mongodb://localhost:27017/?connect=false"
+COROUTINES = 1000
+CALLS_PER_COROUTINE = 100
+
+
+class FastPathHelper(SingletonAsyncMongodbClientHelper):
+    _instances = {}
+    _collections = {}
+
+
+class LockedHelper(SingletonAsyncMongodbClientHelper):
+    """按改造前的实现: 每次 get_instance 都获取类锁，get_collection 不缓存集合对象"""
+    _instances = {}
+
+    @classmethod
+    async def get_instance(cls, connect_url, **pool_options):
+        async with cls._lock:
+            if connect_url not in cls._instances:
+                cls._instances[connect_url] = cls(connect_url, **pool_options)
+            return cls._instances[connect_url]
+
+    @classmethod
+    async def get_collection(cls, connect_url, db_name, coll_name, **pool_options):
+        database = await cls.get_database(connect_url, db_name, **pool_options)
+        return database[coll_name]
+
+
+async def _per_call_us(helper_class):
+    # 类锁在各自的事件循环内创建，避免与其他测试共用
+    helper_class._lock = asyncio.Lock()
+
+    async def worker():
+        for _ in range(CALLS_PER_COROUTINE):
+            await helper_class.get_collection(CONNECT_URL, "benchmark", "items")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(COROUTINES)))
+    elapsed = time.perf_counter() - start
+    for instance in helper_class._instances.values():
+        (await instance.mongo_client).close()
+    return elapsed * 1e6 / (COROUTINES * CALLS_PER_COROUTINE)
+
+
+@pytest.mark.benchmark
+def test_get_collection_overhead_under_concurrency(benchmark_report):
+    locked_us = asyncio.run(_per_call_us(LockedHelper))
+    fast_us = asyncio.run(_per_call_us(FastPathHelper))
+
+    benchmark_report(f"get_collection 单次调用开销({COROUTINES} 个并发协程，每个 {CALLS_PER_COROUTINE} 次)", [
+        {"variant": "class lock per call", "per_call_us": locked_us},
+        {"variant": "lock-free fast path", "per_call_us": fast_us},
+    ])
+    assert fast_us < locked_us
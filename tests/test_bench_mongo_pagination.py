@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("pytz")
+
+from common_sdk.dao.mongo.dao_helper import AsyncMongodbClientHelper
+
+"""基准: list 的 skip/limit 分页与 list_after 的 keyset 分页在不同页深度下的单页耗时"""
+
+DB_NAME = "common_sdk_benchmark"
+PAGE_SIZE = 100
+ORDER_BY = [("score", -1)]
+REPEAT = 5
+
+
+async def _seed(helper, coll_name, count):
+    collection = await helper._get_collection(DB_NAME, coll_name)
+    await collection.drop()
+    batch = []
+    for index in range(count):
+        # score 有大量重复值，依赖 id 作为决胜字段
+        batch.append({"id": f"{index:010d}", "score": index % 1000, "payload": "x" * 64})
+        if len(batch) == 10000:
+            await collection.insert_many(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch)
+    await collection.create_index(ORDER_BY)
+    await helper.ensure_keyset_index(DB_NAME, coll_name, ORDER_BY)
+    return collection
+
+
+async def _median_ms(func):
+    elapsed = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        await func()
+        elapsed.append((time.perf_counter() - start) * 1000)
+    return sorted(elapsed)[len(elapsed) // 2]
+
+
+async def _token_before_page(helper, coll_name, page):
+    """沿 keyset 翻到第 page 页之前，返回读取第 page 页所需的令牌(不计时)"""
+    after = None
+    for _ in range(page - 1):
+        _, after = await helper.list_after(DB_NAME, coll_name, order_by=ORDER_BY, after=after, size=PAGE_SIZE)
+    return after
+
+
+@pytest.mark.benchmark
+def test_skip_limit_vs_keyset_pagination(mongo_url, benchmark_scales, benchmark_report):
+    async def run():
+        helper = AsyncMongodbClientHelper(mongo_url)
+        rows = []
+        try:
+            for count in benchmark_scales([200000]):
+                coll_name = f"pagination_{count}"
+                collection = await _seed(helper, coll_name, count)
+                last_page = count // PAGE_SIZE
+                for page in sorted({1, 10, 100, 1000, last_page // 2, last_page} - {0}):
+                    if page > last_page:
+                        continue
+                    after = await _token_before_page(helper, coll_name, page)
+                    skip_ms = await _median_ms(lambda: helper.list(
+                        DB_NAME, coll_name, order_by=ORDER_BY, page=page, size=PAGE_SIZE
+                    ))
+                    keyset_ms = await _median_ms(lambda: helper.list_after(
+                        DB_NAME, coll_name, order_by=ORDER_BY, after=after, size=PAGE_SIZE, hint=True
+                    ))
+                    rows.append({"docs": count, "page": page, "skip_limit_ms": skip_ms, "keyset_ms": keyset_ms,
+                                 "speedup": skip_ms / keyset_ms})
+                await collection.drop()
+        finally:
+            (await helper.mongo_client).close()
+        return rows
+
+    rows = asyncio.run(run())
+    benchmark_report("Mongo 分页: skip/limit vs keyset (单页中位数耗时)", rows)
+    # keyset 深翻页的代价应与第一页同一量级
+    first, deepest = rows[0], rows[-1]
+    assert deepest["keyset_ms"] < max(first["keyset_ms"] * 10, 50)
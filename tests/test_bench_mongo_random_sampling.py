@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("pytz")
+
+from common_sdk.dao.mongo.dao_helper import AsyncMongodbClientHelper
+from common_sdk.dao.mongo.random_sampler import RandomSampler
+
+"""基准: get_random_document 各取样策略在 1M/10M 文档规模、不同条件命中率下的延迟"""
+
+DB_NAME = "common_sdk_benchmark"
+SAMPLE_SIZE = 10
+REPEAT = 5
+
+# 条件命中率: 无条件 / 约 50% / 约 0.1%
+FILTERS = {
+    "none": None,
+    "dense": {"status": "active"},
+    "selective": {"tenant": "t0"},
+}
+STRATEGIES = [RandomSampler.SAMPLE, RandomSampler.ID_RANGE, RandomSampler.RESERVOIR, RandomSampler.AUTO]
+
+
+async def _seed(helper, coll_name, count):
+    collection = await helper._get_collection(DB_NAME, coll_name)
+    await collection.drop()
+    batch = []
+    for index in range(count):
+        batch.append({
+            "id": f"{index:010d}",
+            "status": "active" if index % 2 else "inactive",
+            "tenant": f"t{index % 1000}",
+        })
+        if len(batch) == 10000:
+            await collection.insert_many(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch)
+    await collection.create_index("status")
+    await collection.create_index("tenant")
+    return collection
+
+
+async def _median_ms(func):
+    await func()  # 预热: 统计信息与样本池在首次调用时建立
+    elapsed = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        await func()
+        elapsed.append((time.perf_counter() - start) * 1000)
+    return sorted(elapsed)[len(elapsed) // 2]
+
+
+@pytest.mark.benchmark
+def test_random_sampling_latency(mongo_url, benchmark_scales, benchmark_report):
+    async def run():
+        sampler = RandomSampler()
+        helper = AsyncMongodbClientHelper(mongo_url, random_sampler=sampler)
+        rows = []
+        try:
+            for count in benchmark_scales([1000000]):
+                coll_name = f"sampling_{count}"
+                collection = await _seed(helper, coll_name, count)
+                for filter_name, conditions in FILTERS.items():
+                    row = {"docs": count, "filter": filter_name}
+                    for strategy in STRATEGIES:
+                        row[f"{strategy}_ms"] = await _median_ms(lambda: helper.get_random_document(
+                            DB_NAME, coll_name, size=SAMPLE_SIZE, conditions=conditions, strategy=strategy
+                        ))
+                    row["auto_choice"] = await sampler.choose_strategy(collection, SAMPLE_SIZE, conditions or {})
+                    rows.append(row)
+                await collection.drop()
+        finally:
+            await sampler.close()
+            (await helper.mongo_client).close()
+        return rows
+
+    rows = asyncio.run(run())
+    benchmark_report(f"get_random_document 延迟(size={SAMPLE_SIZE}，中位数)", rows)
+    assert all(row["auto_choice"] in STRATEGIES for row in rows)
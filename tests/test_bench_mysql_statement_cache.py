@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import Column, Integer, String, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from common_sdk.dao.mysql.dao_helper import AsyncSQLAlchemyClientHelper
+
+"""基准: 模型元数据缓存与参数化语句缓存相对每次反射/构造语句的单次调用开销"""
+
+CALLS = 20000
+QUERIES = 2000
+
+Base = declarative_base()
+
+
+# 21 列的宽表，接近业务表的列数
+Wide = type("Wide", (Base,), {
+    "__tablename__": "wide",
+    "id": Column(Integer, primary_key=True),
+    **{f"col_{index}": Column(String(32)) for index in range(20)},
+})
+
+
+class SQLiteClientHelper(AsyncSQLAlchemyClientHelper):
+    _instances = {}
+
+    def _create_engine(self, db_url):
+        return create_async_engine(db_url, poolclass=AsyncAdaptedQueuePool, pool_size=self.pool_size,
+                                   max_overflow=self.max_overflow, query_cache_size=self.query_cache_size)
+
+
+def _per_call_us(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) * 1e6 / calls
+
+
+def _uncached_filter(model, data):
+    # 改造前的实现: 每次调用遍历 __table__.columns
+    model_columns = {column.name for column in model.__table__.columns}
+    return {key: value for key, value in data.items() if key in model_columns}
+
+
+async def _query_us(helper, build):
+    async with helper.get_session() as session:
+        await session.execute(*build(1))
+        start = time.perf_counter()
+        for index in range(QUERIES):
+            (await session.execute(*build(index % 100 + 1))).first()
+        return (time.perf_counter() - start) * 1e6 / QUERIES
+
+
+@pytest.mark.benchmark
+def test_metadata_and_statement_cache(tmp_path, benchmark_report):
+    data = {**{f"col_{index}": "v" for index in range(20)}, "id": 1, "extra": "ignored"}
+    rows = [
+        {"case": "filter_data_for_model, walk __table__", "per_call_us": _per_call_us(
+            lambda: _uncached_filter(Wide, data), CALLS)},
+        {"case": "filter_data_for_model, metadata cache", "per_call_us": _per_call_us(
+            lambda: AsyncSQLAlchemyClientHelper.filter_data_for_model(Wide, data), CALLS)},
+    ]
+
+    async def run(db_name, query_cache_size):
+        helper = await SQLiteClientHelper.create(f"sqlite+aiosqlite:///{tmp_path}/{db_name}.db", pool_size=1,
+                                                 max_overflow=0, query_cache_size=query_cache_size)
+        try:
+            async with helper.engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with helper.get_session() as session:
+                await helper.bulk_insert(session, Wide, [{"id": index, "col_0": str(index)} for index in range(1, 101)])
+            new_statement = await _query_us(helper, lambda pk: (select(Wide).where(Wide.id == pk),))
+            cached_statement = await _query_us(helper, lambda pk: (
+                helper.get_statement(Wide, "select_by_pk"), {"pk_id": pk}
+            ))
+            return new_statement, cached_statement
+        finally:
+            await helper.close()
+
+    uncompiled_new, _ = asyncio.run(run("no_compiled_cache", 0))
+    cached_new, cached_statement = asyncio.run(run("compiled_cache", 500))
+    rows += [
+        {"case": "select by pk, new construct, no compiled cache", "per_call_us": uncompiled_new},
+        {"case": "select by pk, new construct, compiled cache", "per_call_us": cached_new},
+        {"case": "select by pk, get_statement, compiled cache", "per_call_us": cached_statement},
+    ]
+
+    benchmark_report("MySQL DAO 元数据与语句缓存(单次调用开销)", rows)
+    assert rows[1]["per_call_us"] < rows[0]["per_call_us"]
+    assert cached_statement < uncompiled_new
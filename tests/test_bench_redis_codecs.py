@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import random
+import time
+
+import pytest
+
+pytest.importorskip("ujson")
+
+from common_sdk.util.redis_codecs import CompressedCodec, MsgpackCodec, OrjsonCodec, UJsonCodec
+
+"""基准: 各编解码器对典型缓存数据的编码/解码吞吐与存储大小"""
+
+TARGET_SECONDS = 0.2
+
+
+def _payloads():
+    rng = random.Random(0)
+    record = lambda index: {  # noqa: E731
+        "id": f"{index:012d}",
+        "name": f"user-{index}",
+        "status": rng.choice(["active", "inactive", "banned"]),
+        "score": rng.random() * 100,
+        "tags": [rng.choice(["vip", "new", "trial", "internal"]) for _ in range(3)],
+        "updateTime": 1700000000 + index,
+    }
+    payloads = {
+        "session": record(0),
+        "list page x100": [record(index) for index in range(100)],
+        "export x10000": [record(index) for index in range(10000)],
+    }
+    try:
+        import numpy
+        payloads["embedding float32[768]"] = numpy.random.default_rng(0).random(768, dtype=numpy.float32)
+    except ImportError:
+        pass
+    return payloads
+
+
+def _codecs():
+    factories = {
+        "ujson": UJsonCodec,
+        "orjson": OrjsonCodec,
+        "msgpack": MsgpackCodec,
+        "orjson+zstd": lambda: CompressedCodec(OrjsonCodec(), "zstd"),
+        "orjson+lz4": lambda: CompressedCodec(OrjsonCodec(), "lz4"),
+    }
+    codecs = {}
+    for name, factory in factories.items():
+        try:
+            codecs[name] = factory()
+        except ImportError:
+            pass  # 未安装可选依赖的编解码器不参与对比
+    return codecs
+
+
+def _per_call_us(func):
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < TARGET_SECONDS:
+        func()
+        calls += 1
+    return (time.perf_counter() - start) * 1e6 / calls
+
+
+@pytest.mark.benchmark
+def test_codec_throughput_and_size(benchmark_report):
+    codecs = _codecs()
+    rows = []
+    for payload_name, payload in _payloads().items():
+        baseline = None
+        for codec_name, codec in codecs.items():
+            try:
+                data = codec.encode(payload)
+            except TypeError:
+                continue  # ujson 不支持 numpy 数组等类型
+            baseline = baseline or len(data)
+            rows.append({
+                "payload": payload_name,
+                "codec": codec_name,
+                "bytes": len(data),
+                "size_ratio": len(data) / baseline,
+                "encode_us": _per_call_us(lambda: codec.encode(payload)),
+                "decode_us": _per_call_us(lambda: codec.decode(data)),
+            })
+
+    benchmark_report("AsyncRedisStorage 编解码器: 单次编码/解码耗时与存储大小(size_ratio 相对 ujson，numpy 相对 orjson)", rows)
+    assert {row["codec"] for row in rows} >= {"ujson"}
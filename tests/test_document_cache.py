@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+
+import pytest
+
+pytest.importorskip("bson")
+pytest.importorskip("redis")
+
+from bson import ObjectId, json_util
+
+from common_sdk.dao.mongo.document_cache import DocumentCache
+
+"""DocumentCache 的 Redis 二级缓存: 回填、读取还原、失效与写入失败时的降级"""
+
+
+class FakeRedisStorage:
+    """按 AsyncRedisStorage 的 get/set/delete 接口实现的内存存储，记录写入的过期时间"""
+
+    def __init__(self, fail_on_set=False):
+        self.data = {}
+        self.expired = {}
+        self.fail_on_set = fail_on_set
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, data, expired=7200):
+        if self.fail_on_set:
+            raise ConnectionError("redis is down")
+        self.data[key] = data
+        self.expired[key] = expired
+        return True
+
+    async def delete(self, key):
+        return self.data.pop(key, None) is not None
+
+
+def _document():
+    return {"id": "a1", "_id": ObjectId(), "createTime": datetime.datetime(2024, 1, 1, 8, 30), "tags": ["x"]}
+
+
+def test_redis_miss_fills_extended_json_with_ttl():
+    storage = FakeRedisStorage()
+    cache = DocumentCache(ttl=60, redis_storage=storage, redis_ttl=300)
+    document = _document()
+
+    async def loader():
+        return document
+
+    result = asyncio.run(cache.get("db", "coll", {"id": "a1"}, loader))
+
+    assert result == document
+    redis_key = "mongo_doc_cache:db:coll:a1"
+    assert json_util.loads(storage.data[redis_key]) == document
+    assert storage.expired[redis_key] == 300
+
+
+def test_redis_hit_restores_bson_types_without_loading():
+    storage = FakeRedisStorage()
+    document = _document()
+    storage.data["mongo_doc_cache:db:coll:a1"] = json_util.dumps(document)
+    cache = DocumentCache(redis_storage=storage)
+
+    async def loader():
+        raise AssertionError("loader should not be called on a Redis hit")
+
+    result = asyncio.run(cache.get("db", "coll", {"id": "a1"}, loader))
+
+    assert result == document
+    assert isinstance(result["_id"], ObjectId)
+    assert isinstance(result["createTime"], datetime.datetime)
+    assert cache.stats()["redis_hits"] == 1
+
+
+def test_invalidate_deletes_redis_entry():
+    storage = FakeRedisStorage()
+    cache = DocumentCache(redis_storage=storage)
+
+    async def run():
+        async def loader():
+            return _document()
+        await cache.get("db", "coll", {"id": "a1"}, loader)
+        await cache.invalidate("db", "coll", ["a1"])
+
+    asyncio.run(run())
+
+    assert storage.data == {}
+
+
+def test_redis_failures_keep_local_tier():
+    storage = FakeRedisStorage(fail_on_set=True)
+    cache = DocumentCache(redis_storage=storage)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return _document()
+
+    async def run():
+        first = await cache.get("db", "coll", {"id": "a1"}, loader)
+        second = await cache.get("db", "coll", {"id": "a1"}, loader)
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == second
+    assert len(loads) == 1
+
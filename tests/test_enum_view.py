@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("pytz")
+
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
+
+from common_sdk.dao.mongo.enum_view import EnumView
+
+"""EnumView 启动: 首次加载有超时上限，change stream 不可用或无权限时退化为轮询"""
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self._documents = iter(documents)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._documents)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    full_name = "db.coll"
+
+    def __init__(self, documents=(), watch_error=None, find_error=None):
+        self.documents = list(documents)
+        self.watch_error = watch_error
+        self.find_error = find_error
+
+    def watch(self, *args, **kwargs):
+        raise self.watch_error
+
+    def find(self, *args, **kwargs):
+        if self.find_error is not None:
+            raise self.find_error
+        return FakeCursor(self.documents)
+
+
+def test_start_raises_first_error_when_initial_load_keeps_failing():
+    collection = FakeCollection(watch_error=ServerSelectionTimeoutError("no servers"))
+    view = EnumView(collection, ["type"], poll_interval=0.01, start_timeout=0.2)
+
+    async def run():
+        with pytest.raises(ServerSelectionTimeoutError):
+            await asyncio.wait_for(view.start(), 5)
+        return view._task
+
+    assert asyncio.run(run()) is None
+    assert not view.ready
+
+
+def test_start_falls_back_to_polling_without_change_stream_privilege():
+    collection = FakeCollection(
+        documents=[{"_id": 1, "type": "a"}, {"_id": 2, "type": "a"}, {"_id": 3, "type": "b"}],
+        watch_error=OperationFailure("not authorized to execute changeStream", code=13),
+    )
+    view = EnumView(collection, ["type"], poll_interval=60, start_timeout=1)
+
+    async def run():
+        await view.start()
+        try:
+            return view.mode, sorted(view.result(), key=lambda item: item["type"])
+        finally:
+            await view.close()
+
+    mode, result = asyncio.run(run())
+
+    assert mode == "polling"
+    assert result == [{"type": "a", "count": 2}, {"type": "b", "count": 1}]
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+"""导入耗时回归检查: 模块级单例必须延迟到首次使用时创建，导入本身不能建连接池、读配置或加载节日库"""
+
+for dependency in ("redis", "ujson", "borax", "tencentcloud", "sqlalchemy"):
+    pytest.importorskip(dependency)
+
+MODULES = [
+    "common_sdk.util.redis_utils",
+    "common_sdk.service_client.api.sms.sms_client",
+    "common_sdk.util.festival_utils",
+]
+
+# 三个模块的累计导入耗时上限(毫秒)，CI 机器较慢时可通过环境变量放宽
+IMPORT_TIME_BUDGET_MS = float(os.environ.get("COMMON_SDK_IMPORT_TIME_BUDGET_MS", 3000))
+
+CHECK_SCRIPT = """
+import {modules}
+from common_sdk.util import redis_utils, festival_utils
+from common_sdk.service_client.api.sms import sms_client
+
+assert not redis_utils.RedisInstanceManager._instances, "import created a Redis connection pool"
+assert not redis_utils.async_redis_storage.initialized, "import built async_redis_storage"
+assert not sms_client.tencent_sms_client.initialized, "import built TencentSMSClient"
+assert not festival_utils.festival_utils.initialized, "import loaded the festival library"
+""".format(modules=", ".join(MODULES))
+
+_IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\S.*)$")
+
+
+def _run(sdk_path, *args):
+    env = dict(os.environ, PYTHONPATH=sdk_path)
+    return subprocess.run([sys.executable, *args], env=env, capture_output=True, text=True, timeout=120)
+
+
+def test_import_does_not_build_singletons(sdk_path):
+    result = _run(sdk_path, "-c", CHECK_SCRIPT)
+    assert result.returncode == 0, result.stderr
+
+
+def test_import_time_within_budget(sdk_path):
+    result = _run(sdk_path, "-X", "importtime", "-c", f"import {', '.join(MODULES)}")
+    assert result.returncode == 0, result.stderr
+    cumulative_us = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match:
+            cumulative_us[match.group(3).strip()] = int(match.group(2))
+    missing = [module for module in MODULES if module not in cumulative_us]
+    assert not missing, f"modules missing from -X importtime output: {missing}"
+    total_ms = sum(cumulative_us[module] for module in MODULES) / 1000
+    slowest = sorted(cumulative_us.items(), key=lambda item: item[1], reverse=True)[:10]
+    assert total_ms <= IMPORT_TIME_BUDGET_MS, (
+        f"import took {total_ms:.0f}ms (budget {IMPORT_TIME_BUDGET_MS:.0f}ms), slowest: {slowest}"
+    )
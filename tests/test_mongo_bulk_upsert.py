@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import gc
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("pytz")
+
+from common_sdk.dao.mongo.dao_helper import AsyncMongodbClientHelper
+
+"""bulk_upsert 数据源中途异常: 已提交的批次写完后再抛出原异常，不遗留未取结果的任务"""
+
+
+class FakeBulkWriteResult:
+    def __init__(self, count):
+        self.upserted_count = count
+        self.modified_count = 0
+        self.matched_count = 0
+
+
+class FakeCollection:
+    def __init__(self):
+        self.written = 0
+
+    async def bulk_write(self, operations, ordered=False):
+        await asyncio.sleep(0.01)
+        self.written += len(operations)
+        return FakeBulkWriteResult(len(operations))
+
+
+class SourceError(Exception):
+    pass
+
+
+def test_source_error_waits_for_submitted_chunks(monkeypatch):
+    collection = FakeCollection()
+    helper = AsyncMongodbClientHelper("mongodb://localhost:27017")
+
+    async def get_collection(db_name, coll_name):
+        return collection
+
+    monkeypatch.setattr(helper, "_get_collection", get_collection)
+
+    async def source():
+        for index in range(25):
+            yield {"id": index}
+        raise SourceError("source failed")
+
+    unretrieved = []
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unretrieved.append(context))
+        with pytest.raises(SourceError):
+            await helper.bulk_upsert("db", "coll", source(), chunk_size=10, concurrency=4)
+        gc.collect()
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert collection.written == 20
+    assert not unretrieved
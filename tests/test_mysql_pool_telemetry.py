@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from common_sdk.dao.mysql.dao_helper import SingletonAsyncSQLAlchemyClientHelper
+from common_sdk.dao.pool_telemetry import get_telemetry
+
+"""MySQL DAO 的连接池监控: 不依赖 Mongo 驱动，主库与从库都记录获取连接耗时"""
+
+
+class SQLiteClientHelper(SingletonAsyncSQLAlchemyClientHelper):
+    _instances = {}
+
+    def _create_engine(self, db_url):
+        # aiosqlite 默认使用 NullPool，测试时换成与 MySQL 相同的队列连接池
+        return create_async_engine(db_url, poolclass=AsyncAdaptedQueuePool, pool_size=self.pool_size,
+                                   max_overflow=self.max_overflow)
+
+
+def test_mysql_dao_imports_without_mongo_driver(sdk_path):
+    script = (
+        "import sys\n"
+        "sys.modules['pymongo'] = sys.modules['motor'] = sys.modules['bson'] = None\n"
+        "import common_sdk.dao.mysql.dao_helper\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], env=dict(os.environ, PYTHONPATH=sdk_path),
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+
+def test_replica_checkout_latency_is_recorded(tmp_path):
+    primary_url = f"sqlite+aiosqlite:///{tmp_path}/primary.db"
+    replica_url = f"sqlite+aiosqlite:///{tmp_path}/replica.db"
+
+    async def run():
+        helper = await SQLiteClientHelper.create(primary_url, pool_size=2, max_overflow=2, replica_urls=[replica_url],
+                                                 health_check_interval=None, pool_telemetry=True)
+        try:
+            for _ in range(3):
+                async with helper.get_session(readonly=True) as session:
+                    await session.execute(text("SELECT 1"))
+            async with helper.get_session() as session:
+                await session.execute(text("SELECT 1"))
+            replica = helper.replica_router.replicas[0]
+            return helper.pool_telemetry.snapshot(), replica.pool_telemetry.snapshot()
+        finally:
+            await helper.close()
+
+    primary, replica = asyncio.run(run())
+
+    assert replica["checkout_latency"]["count"] == 3
+    assert replica["checkouts"] == 3
+    assert primary["checkout_latency"]["count"] == 1
+    assert get_telemetry(f"sqlalchemy:{replica_url}") is not None
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+pytest.importorskip("redis")
+
+from common_sdk.util.redis_rate_limiter import TokenBucketRateLimiter
+
+"""限流器的本地并发行为: 访问 Redis 时不串行化，预取令牌时合并补充"""
+
+
+class FakeBucketRedis:
+    """register_script 返回模拟令牌桶脚本的协程函数，每次调用有 rtt 秒的往返延迟"""
+
+    def __init__(self, tokens, rtt=0.001):
+        self.tokens = tokens
+        self.rtt = rtt
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def register_script(self, script):
+        async def run(keys, args):
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(self.rtt)
+            self.in_flight -= 1
+            _, _, requested, min_granted = args
+            granted = min(self.tokens, requested)
+            if granted < min_granted:
+                return [0, 100]
+            self.tokens -= granted
+            return [granted, 0]
+        return run
+
+
+def test_concurrent_try_acquire_is_not_rejected_by_contention():
+    redis_client = FakeBucketRedis(tokens=100)
+    limiter = TokenBucketRateLimiter(redis_client, "rate:test", rate=100, capacity=100)
+
+    async def run():
+        return await asyncio.gather(*(limiter.try_acquire() for _ in range(10)))
+
+    assert all(asyncio.run(run()))
+    assert redis_client.max_in_flight == 10
+    assert limiter.stats()["rejected"] == 0
+
+
+def test_try_acquire_rejects_when_quota_is_exhausted():
+    redis_client = FakeBucketRedis(tokens=3)
+    limiter = TokenBucketRateLimiter(redis_client, "rate:test", rate=100, capacity=100)
+
+    async def run():
+        return await asyncio.gather(*(limiter.try_acquire() for _ in range(5)))
+
+    assert sorted(asyncio.run(run())) == [False, False, True, True, True]
+
+
+def test_lease_refill_is_shared_by_concurrent_callers():
+    redis_client = FakeBucketRedis(tokens=100)
+    limiter = TokenBucketRateLimiter(redis_client, "rate:test", rate=100, capacity=100, lease=10)
+
+    async def run():
+        return await asyncio.gather(*(limiter.try_acquire() for _ in range(10)))
+
+    assert all(asyncio.run(run()))
+    assert redis_client.calls == 1
+    assert redis_client.tokens == 90
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import Column, Integer, String, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from common_sdk.dao.mysql import statement_profiler
+from common_sdk.dao.mysql.dao_helper import AsyncSQLAlchemyClientHelper
+from common_sdk.dao.mysql.statement_profiler import StatementProfiler, statement_shape
+
+"""会话级语句统计: 提交时 flush 的语句计入统计，批量/分页辅助方法不触发 N+1 告警，语句形态保留元组列数"""
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "item"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(32))
+
+
+class SQLiteClientHelper(AsyncSQLAlchemyClientHelper):
+    _instances = {}
+
+    def _create_engine(self, db_url):
+        return create_async_engine(db_url, poolclass=AsyncAdaptedQueuePool, pool_size=self.pool_size,
+                                   max_overflow=self.max_overflow)
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.infos = []
+        self.warnings = []
+
+    def info(self, message):
+        self.infos.append(message)
+
+    def warning(self, message):
+        self.warnings.append(message)
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    recorder = RecordingLogger()
+    monkeypatch.setattr(statement_profiler, "logger", recorder)
+    return recorder
+
+
+def _run_with_helper(tmp_path, scenario):
+    async def run():
+        helper = await SQLiteClientHelper.create(f"sqlite+aiosqlite:///{tmp_path}/profiler.db", pool_size=2,
+                                                 max_overflow=2, statement_profiler=StatementProfiler())
+        try:
+            async with helper.engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            await scenario(helper)
+        finally:
+            await helper.close()
+
+    asyncio.run(run())
+
+
+def test_statements_flushed_at_commit_are_tracked(tmp_path, recorder):
+    async def scenario(helper):
+        recorder.infos.clear()
+        async with helper.get_session() as session:
+            for index in range(5):
+                session.add(Item(id=index + 1, name=f"item-{index}"))
+
+    _run_with_helper(tmp_path, scenario)
+
+    assert len(recorder.infos) == 1
+    assert "语句数=0" not in recorder.infos[0]
+    assert "INSERT INTO item" in recorder.infos[0]
+
+
+def test_helpers_do_not_trigger_n_plus_one(tmp_path, recorder):
+    async def scenario(helper):
+        async with helper.get_session() as session:
+            await helper.bulk_insert(session, Item, [{"id": i, "name": f"item-{i}"} for i in range(1, 51)],
+                                     chunk_size=5)
+        async with helper.get_session() as session:
+            after = None
+            while True:
+                rows, after = await helper.paginate_keyset(session, select(Item), [Item.id], after=after, size=5)
+                if after is None:
+                    break
+
+    _run_with_helper(tmp_path, scenario)
+
+    assert not [message for message in recorder.warnings if "N+1" in message]
+
+
+def test_repeated_select_is_reported_as_n_plus_one(tmp_path, recorder):
+    async def scenario(helper):
+        async with helper.get_session() as session:
+            for index in range(6):
+                await session.execute(select(Item).where(Item.id == index))
+
+    _run_with_helper(tmp_path, scenario)
+
+    assert len([message for message in recorder.warnings if "N+1" in message]) == 1
+
+
+def test_statement_shape_keeps_row_value_arity():
+    assert statement_shape("SELECT * FROM t WHERE (a, b) > (?, ?)") == "SELECT * FROM t WHERE (a, b) > (?, ?)"
+    assert statement_shape("SELECT * FROM t WHERE id IN (1, 2, 3)") == "SELECT * FROM t WHERE id IN (?)"
+    assert statement_shape("SELECT * FROM t WHERE (a, b) IN ((1, 2), (3, 4))") == (
+        "SELECT * FROM t WHERE (a, b) IN ((?, ?))"
+    )
+    assert statement_shape("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)") == (
+        "INSERT INTO t (a, b) VALUES (?, ?), ..."
+    )
@@ -2,6 +2,8 @@ from datetime import date, timedelta
 from borax.calendars import LunarDate
 from borax.calendars.festivals2 import FestivalLibrary
 
+from common_sdk.base_class.lazy_proxy import LazyProxy
+
 
 class FestivalResult:
     """表示节日的结果类，包含阳历和阴历节日"""
@@ -91,7 +93,8 @@ class FestivalUtils:
         return None
 
 
-festival_utils = FestivalUtils()
+# 首次使用时才加载节日库
+festival_utils: FestivalUtils = LazyProxy(FestivalUtils)
 # 示例调用
 if __name__ == "__main__":
     service = FestivalUtils()
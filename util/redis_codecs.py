@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import ujson
+from typing import Any, Dict
+
+"""
+AsyncRedisStorage 的可插拔序列化编解码器。
+
+除兼容旧数据的 UJsonCodec 外，编码结果的第一个字节是编解码器标识(0x01~0x07，不会与 JSON 文本的首字符冲突)，
+读取时按标识自动选择解码器，无标识的数据按 ujson 解析。因此同一个 key 空间内可以混存不同编码，
+切换编解码器时新旧 worker 可以同时运行，不需要停机迁移。
+"""
+
+_decoders: Dict[int, "Codec"] = {}
+
+
+def decode_value(data: bytes) -> Any:
+    """按首字节标识解码，无标识时按 ujson 解析(旧数据)"""
+    codec = _decoders.get(data[0])
+    if codec is None:
+        return ujson.loads(data)
+    return codec.decode_payload(data[1:])
+
+
+class Codec:
+    header: int = 0
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.header:
+            _decoders[cls.header] = cls.decoder()
+
+    @classmethod
+    def decoder(cls) -> "Codec":
+        """返回用于解码的实例，可选依赖未安装时延迟到实际解码时报错"""
+        return cls.__new__(cls)
+
+    def encode(self, value: Any) -> bytes:
+        return bytes((self.header,)) + self.encode_payload(value)
+
+    def decode(self, data: bytes) -> Any:
+        return decode_value(data)
+
+    def encode_payload(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode_payload(self, payload: bytes) -> Any:
+        raise NotImplementedError
+
+
+class UJsonCodec(Codec):
+    """不带标识的 ujson 编码，与历史数据格式完全一致，是 AsyncRedisStorage 的默认编解码器"""
+
+    def encode(self, value: Any) -> bytes:
+        return ujson.dumps(value).encode("utf-8")
+
+
+class OrjsonCodec(Codec):
+    """orjson 编码，比 ujson 更快，支持 numpy 数组(解码为列表)、datetime、dataclass"""
+    header = 0x01
+
+    def __init__(self) -> None:
+        import orjson
+        self._options = orjson.OPT_SERIALIZE_NUMPY
+
+    def encode_payload(self, value: Any) -> bytes:
+        import orjson
+        return orjson.dumps(value, option=self._options)
+
+    def decode_payload(self, payload: bytes) -> Any:
+        import orjson
+        return orjson.loads(payload)
+
+
+_NUMPY_EXT_TYPE = 1
+
+
+class MsgpackCodec(Codec):
+    """msgpack 二进制编码，支持 bytes，并以扩展类型原样保存 numpy 数组(dtype/shape 不丢失)，需要安装 msgpack"""
+    header = 0x02
+
+    def __init__(self) -> None:
+        import msgpack  # noqa: F401
+
+    def encode_payload(self, value: Any) -> bytes:
+        import msgpack
+        return msgpack.packb(value, default=self._default, use_bin_type=True)
+
+    def decode_payload(self, payload: bytes) -> Any:
+        import msgpack
+        return msgpack.unpackb(payload, ext_hook=self._ext_hook, raw=False)
+
+    @staticmethod
+    def _default(obj):
+        import msgpack
+        if type(obj).__module__ == "numpy" and hasattr(obj, "tobytes"):
+            import numpy
+            array = numpy.ascontiguousarray(obj)
+            return msgpack.ExtType(
+                _NUMPY_EXT_TYPE, msgpack.packb([array.dtype.str, list(array.shape), array.tobytes()])
+            )
+        raise TypeError(f"Object of type {type(obj).__name__} is not msgpack serializable")
+
+    @staticmethod
+    def _ext_hook(code, data):
+        import msgpack
+        if code == _NUMPY_EXT_TYPE:
+            import numpy
+            dtype, shape, buffer = msgpack.unpackb(data, raw=False)
+            return numpy.frombuffer(buffer, dtype=dtype).reshape(shape)
+        return msgpack.ExtType(code, data)
+
+
+class _Compression(Codec):
+    def compress(self, payload: bytes) -> bytes:
+        raise NotImplementedError
+
+    def decode_payload(self, payload: bytes) -> Any:
+        return decode_value(self.decompress(payload))
+
+    def decompress(self, payload: bytes) -> bytes:
+        raise NotImplementedError
+
+
+class ZstdCompression(_Compression):
+    header = 0x03
+
+    def __init__(self, level: int = 3) -> None:
+        import zstandard
+        self._compressor = zstandard.ZstdCompressor(level=level)
+
+    def compress(self, payload: bytes) -> bytes:
+        return self._compressor.compress(payload)
+
+    def decompress(self, payload: bytes) -> bytes:
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(payload)
+
+
+class Lz4Compression(_Compression):
+    header = 0x04
+
+    def __init__(self) -> None:
+        import lz4.frame  # noqa: F401
+
+    def compress(self, payload: bytes) -> bytes:
+        import lz4.frame
+        return lz4.frame.compress(payload)
+
+    def decompress(self, payload: bytes) -> bytes:
+        import lz4.frame
+        return lz4.frame.decompress(payload)
+
+
+class CompressedCodec(Codec):
+    """
+    先用 inner 编码，编码结果超过 threshold 字节时再压缩。压缩后的数据带压缩算法标识，解压后按 inner 的标识解码。
+
+    Args:
+        inner: 内层编解码器，默认 OrjsonCodec
+        algorithm: zstd(需要 zstandard) 或 lz4(需要 lz4)
+        threshold: 触发压缩的最小字节数
+    """
+
+    _algorithms = {"zstd": ZstdCompression, "lz4": Lz4Compression}
+
+    def __init__(self, inner: Codec = None, algorithm: str = "zstd", threshold: int = 1024) -> None:
+        if algorithm not in self._algorithms:
+            raise ValueError(f"Unsupported compression algorithm: {algorithm}")
+        self._inner = inner or OrjsonCodec()
+        self._compression = self._algorithms[algorithm]()
+        self.threshold = threshold
+
+    def encode(self, value: Any) -> bytes:
+        data = self._inner.encode(value)
+        if len(data) < self.threshold:
+            return data
+        return bytes((self._compression.header,)) + self._compression.compress(data)
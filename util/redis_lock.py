@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+import uuid
+from typing import Dict, Optional
+
+import redis.asyncio as aioredis
+
+from .redis_sharding import has_hash_tag, is_distributed, pubsub_client
+from ..logging.logger import logger
+
+"""Redis 分布式锁: NX + 随机令牌、Lua 原子释放与续期、fencing token、释放通知与竞争统计"""
+
+# KEYS[1]: 锁; KEYS[2]: fencing 计数器; ARGV: 令牌, 过期毫秒数
+# 成功返回 {fencing token, 0}，失败返回 {0, 锁剩余毫秒数}
+_ACQUIRE_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return {redis.call('INCR', KEYS[2]), 0}
+end
+return {0, redis.call('PTTL', KEYS[1])}
+"""
+
+# KEYS[1]: 锁; KEYS[2]: 释放通知频道; ARGV[1]: 令牌
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    redis.call('PUBLISH', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# KEYS[1]: 锁; ARGV: 令牌, 过期毫秒数
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_metrics: Dict[str, "LockMetrics"] = {}
+
+# 不支持 pub/sub 时(Redis Cluster)等待锁释放的最长轮询间隔(秒)
+_POLL_INTERVAL = 0.1
+
+
+def lock_stats() -> dict:
+    """返回开启统计的锁的竞争统计，key 为 RedisLock 的 metrics_name"""
+    return {name: metrics.snapshot() for name, metrics in _metrics.items()}
+
+
+class LockMetrics:
+    def __init__(self) -> None:
+        self.acquired = 0
+        self.contended = 0  # 首次尝试未获取到、需要等待的次数
+        self.timeouts = 0
+        self.lost = 0  # 续期时发现锁已被他人持有或过期的次数
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def observe_wait(self, elapsed_ms: float) -> None:
+        self.total_wait_ms += elapsed_ms
+        self.max_wait_ms = max(self.max_wait_ms, elapsed_ms)
+
+    def snapshot(self) -> dict:
+        return {
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "timeouts": self.timeouts,
+            "lost": self.lost,
+            "avg_wait_ms": round(self.total_wait_ms / self.contended, 3) if self.contended else 0,
+            "max_wait_ms": round(self.max_wait_ms, 3),
+        }
+
+
+class RedisLock:
+    """
+    基于 SET NX PX 的分布式锁，每次获取生成随机令牌，只有持有者能释放或续期。
+
+    - 每次成功获取都会返回单调递增的 fencing_token，下游存储可据此拒绝过期持有者的写入；
+    - auto_renew=True 时后台按 ttl/3 间隔续期，适合耗时不确定的临界区；
+    - 等待时订阅释放通知频道，锁释放后立即重试，最长等待到锁的剩余过期时间，不做轮询。
+
+    一个 RedisLock 对象同一时间只代表一次持有，并发的协程应各自创建锁对象。
+    Redis Cluster/ShardedRedis 下 name 不带 hash tag 时，实际使用的 key 为 {name}，
+    使锁、fencing 计数器和释放通知频道落在同一个 slot/节点。Redis Cluster 不支持 pub/sub，等待时退化为按剩余过期时间有界轮询。
+
+    >>> async with RedisLock(redis_client, "lock:order:1", ttl=10, auto_renew=True) as lock:
+    >>>     await save(order, fencing_token=lock.fencing_token)
+    """
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        name: str,
+        ttl: float = 30,
+        auto_renew: bool = False,
+        blocking_timeout: Optional[float] = None,
+        metrics_name: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            name: 锁的 key
+            ttl: 锁的过期时间(秒)
+            auto_renew: 是否在持有期间自动续期
+            blocking_timeout: async with 使用时的最长等待时间(秒)，为空时一直等待
+            metrics_name: 竞争统计的名称，为空时不计入 lock_stats；按实体加锁(如 lock:order:<id>)时
+                应使用同一类锁共用的名称(如 lock:order)汇总，避免统计表无限增长
+        """
+        if ttl <= 0:
+            raise ValueError("Lock timeout must be greater than 0 seconds.")
+        self._redis_client = redis_client
+        self.name = name
+        self.ttl_ms = int(ttl * 1000)
+        self.auto_renew = auto_renew
+        self.blocking_timeout = blocking_timeout
+        self.fencing_token: Optional[int] = None
+        self._token: Optional[str] = None
+        self._key = f"{{{name}}}" if is_distributed(redis_client) and not has_hash_tag(name) else name
+        self._fence_key = f"{self._key}:fence"
+        self._channel = f"{self._key}:released"
+        self._watchdog = None
+        self._metrics = _metrics.setdefault(metrics_name, LockMetrics()) if metrics_name else LockMetrics()
+        self._acquire_script = redis_client.register_script(_ACQUIRE_SCRIPT)
+        self._release_script = redis_client.register_script(_RELEASE_SCRIPT)
+        self._renew_script = redis_client.register_script(_RENEW_SCRIPT)
+
+    @property
+    def locked(self) -> bool:
+        return self._token is not None
+
+    async def acquire(self, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        获取锁，成功后 fencing_token 为本次持有的 fencing token。
+
+        Args:
+            blocking: 为 False 时只尝试一次
+            timeout: 最长等待时间(秒)，为空时一直等待
+        """
+        if self._token is not None:
+            raise RuntimeError(f"Lock {self.name} is already held by this object.")
+        token = uuid.uuid4().hex
+        fencing_token, pttl = await self._acquire_script(keys=[self._key, self._fence_key], args=[token, self.ttl_ms])
+        if not fencing_token and blocking:
+            self._metrics.contended += 1
+            start = time.monotonic()
+            fencing_token = await self._wait(token, pttl, timeout)
+            self._metrics.observe_wait((time.monotonic() - start) * 1000)
+        if not fencing_token:
+            if blocking:
+                self._metrics.timeouts += 1
+            return False
+        self._token = token
+        self.fencing_token = fencing_token
+        self._metrics.acquired += 1
+        if self.auto_renew:
+            self._watchdog = asyncio.create_task(self._renew_periodically(token))
+        return True
+
+    async def release(self) -> bool:
+        """释放锁，锁已过期或被他人持有时返回 False"""
+        token, self._token = self._token, None
+        await self._stop_watchdog()
+        if token is None:
+            return False
+        released = await self._release_script(keys=[self._key, self._channel], args=[token])
+        if not released:
+            logger.warning(f"释放锁时锁已过期或被他人持有: {self.name}")
+        return bool(released)
+
+    async def renew(self, ttl: Optional[float] = None) -> bool:
+        """把锁的过期时间重置为 ttl 秒(默认创建时的 ttl)，锁已不属于自己时返回 False"""
+        if self._token is None:
+            return False
+        ttl_ms = int(ttl * 1000) if ttl is not None else self.ttl_ms
+        return bool(await self._renew_script(keys=[self._key], args=[self._token, ttl_ms]))
+
+    async def __aenter__(self) -> "RedisLock":
+        if not await self.acquire(timeout=self.blocking_timeout):
+            raise TimeoutError(f"Timed out acquiring lock {self.name}.")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.release()
+
+    async def _wait(self, token, pttl, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        subscriber = pubsub_client(self._redis_client, self._channel)
+        pubsub = subscriber.pubsub() if subscriber is not None else None
+        try:
+            if pubsub is not None:
+                await pubsub.subscribe(self._channel)
+            while True:
+                # 订阅后再尝试一次，避免订阅前释放的通知丢失
+                fencing_token, pttl = await self._acquire_script(
+                    keys=[self._key, self._fence_key], args=[token, self.ttl_ms]
+                )
+                if fencing_token:
+                    return fencing_token
+                # 锁没有过期时间或刚刚消失时短暂等待后重试
+                wait = pttl / 1000 if pttl > 0 else 0.01
+                if pubsub is None:
+                    wait = min(wait, _POLL_INTERVAL)
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return 0
+                    wait = min(wait, remaining)
+                if pubsub is None:
+                    await asyncio.sleep(wait)
+                else:
+                    await pubsub.get_message(ignore_subscribe_messages=True, timeout=wait)
+        finally:
+            if pubsub is not None:
+                await pubsub.aclose()
+
+    async def _renew_periodically(self, token):
+        interval = self.ttl_ms / 3000
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                renewed = await self._renew_script(keys=[self._key], args=[token, self.ttl_ms])
+            except Exception as e:
+                logger.error(f"锁续期失败: {self.name}, 错误={e}")
+                continue
+            if not renewed:
+                self._metrics.lost += 1
+                logger.error(f"锁续期时发现锁已丢失: {self.name}")
+                return
+
+    async def _stop_watchdog(self):
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            await asyncio.gather(self._watchdog, return_exceptions=True)
+            self._watchdog = None
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import math
+import random
+import time
+from typing import Awaitable, Callable, Generic, List, Optional, TypeVar, Union
+
+from redis.exceptions import ResponseError
+
+from .redis_sharding import is_distributed, pubsub_client
+from .redis_utils import AsyncRedisStorage
+from .single_flight import SingleFlight
+from .ttl_cache import TTLCache
+from ..logging.logger import logger
+
+"""Redis 近端缓存: 进程内 LRU/TTL 一级缓存 + Redis，支持客户端缓存失效通知"""
+
+T = TypeVar("T")
+
+TRACKING_CHANNEL = "__redis__:invalidate"
+_MISSING = object()
+
+
+class AsyncRedisNearCache(Generic[T]):
+    """
+    在 AsyncRedisStorage 前加一层有界的进程内 LRU/TTL 缓存，热点 key 的读取不再访问网络。
+
+    一致性:
+      - tracking=True 时使用 Redis 6 客户端缓存(CLIENT TRACKING BCAST + REDIRECT)，任何客户端修改 key 都会收到失效通知；
+      - Redis 不支持 tracking 或 tracking=False 时退化为 pub/sub 失效通道，只有经由近端缓存 set/delete 的写入会广播失效；
+      - ShardedRedis 只使用 pub/sub 失效通道(通道所在节点)，Redis Cluster 不支持 pub/sub，start 时直接报错。
+    防击穿:
+      - 本地条目按 XFetch 算法概率性提前刷新，越接近过期、回源越慢的条目越早在后台刷新；
+      - 同一 key 的并发回源通过 SingleFlight 合并。
+
+    返回的是缓存中的共享对象，调用方不要修改。
+    """
+
+    def __init__(
+        self,
+        storage: AsyncRedisStorage[T],
+        max_entries: int = 10000,
+        ttl: float = 60,
+        tracking: bool = True,
+        prefixes: Optional[List[str]] = None,
+        invalidation_channel: str = "near_cache:invalidate",
+        beta: float = 1.0,
+        reconnect_interval: float = 1.0,
+    ) -> None:
+        """
+        Args:
+            storage: 二级缓存使用的 AsyncRedisStorage
+            max_entries: 本地缓存最大条目数
+            ttl: 本地缓存过期时间(秒)
+            tracking: 是否优先使用 Redis 客户端缓存失效通知
+            prefixes: tracking 模式下只订阅这些前缀的 key，为空时订阅全部
+            invalidation_channel: pub/sub 退化模式使用的失效通道
+            beta: XFetch 提前刷新系数，越大越早刷新
+        """
+        self._storage = storage
+        self._local = TTLCache(max_entries=max_entries, ttl=ttl)
+        self._single_flight = SingleFlight(copy_result=False)
+        self.tracking = tracking
+        self.prefixes = prefixes or []
+        self.invalidation_channel = invalidation_channel
+        self.beta = beta
+        self.reconnect_interval = reconnect_interval
+        self.mode = None  # tracking / pubsub
+        self.invalidations = 0
+        self.early_refreshes = 0
+        self._generation = 0
+        self._listener_task = None
+        self._refresh_tasks = set()
+
+    async def start(self) -> None:
+        """建立失效通知监听，必须在使用前调用"""
+        if self._listener_task is not None:
+            return
+        subscriber = pubsub_client(self._storage.redis_client, self.invalidation_channel)
+        if subscriber is None:
+            raise ValueError("AsyncRedisNearCache requires pub/sub, which redis.asyncio RedisCluster does not support.")
+        self.mode = "pubsub"
+        if self.tracking and not is_distributed(self._storage.redis_client):
+            try:
+                connections = await self._open_tracking_connections()
+                self.mode = "tracking"
+            except ResponseError as e:
+                logger.warning(f"Redis 不支持客户端缓存 tracking，改用 pub/sub 失效通道: {e}")
+        if self.mode == "tracking":
+            self._listener_task = asyncio.create_task(self._listen_tracking(connections))
+        else:
+            self._listener_task = asyncio.create_task(self._listen_pubsub())
+
+    async def close(self) -> None:
+        tasks = list(self._refresh_tasks)
+        if self._listener_task is not None:
+            tasks.append(self._listener_task)
+            self._listener_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._local.clear()
+
+    async def get(self, key: str) -> Union[T, None]:
+        return await self.get_or_load(key)
+
+    async def get_or_load(
+        self, key: str, loader: Optional[Callable[[], Awaitable[T]]] = None, expired: int = 7200
+    ) -> Union[T, None]:
+        """
+        依次读取本地缓存、Redis，都未命中且提供了 loader 时调用 loader 回源并写入 Redis(过期时间 expired 秒)。
+        """
+        entry = self._local.get(key, _MISSING)
+        if entry is not _MISSING:
+            value, delta = entry
+            if self._should_refresh_early(key, delta):
+                self._refresh_in_background(key, loader, expired)
+            return value
+        return await self._single_flight.do(key, lambda: self._fetch(key, loader, expired))
+
+    async def set(self, key: str, data: T, expired: int = 7200) -> bool:
+        result = await self._storage.set(key, data, expired)
+        await self._invalidate(key)
+        return result
+
+    async def delete(self, key: str) -> None:
+        await self._storage.delete(key)
+        await self._invalidate(key)
+
+    def stats(self) -> dict:
+        return {
+            **self._local.stats(),
+            "mode": self.mode,
+            "invalidations": self.invalidations,
+            "early_refreshes": self.early_refreshes,
+            "single_flight": self._single_flight.stats(),
+        }
+
+    async def _fetch(self, key, loader, expired):
+        generation = self._generation
+        start = time.monotonic()
+        value = await self._storage.get(key)
+        if value is None and loader is not None:
+            value = await loader()
+            if value is not None:
+                await self._storage.set(key, value, expired)
+        # 回源期间收到过失效通知时不写入本地缓存，避免缓存旧值
+        if value is not None and generation == self._generation:
+            # 记录回源耗时，供 XFetch 计算提前刷新概率
+            self._local.set(key, (value, time.monotonic() - start))
+        return value
+
+    def _should_refresh_early(self, key, delta):
+        expire_at = self._local.expire_at(key)
+        if expire_at is None or not delta:
+            return False
+        return time.monotonic() - delta * self.beta * math.log(random.random() or 1e-12) >= expire_at
+
+    def _refresh_in_background(self, key, loader, expired):
+        self.early_refreshes += 1
+        task = asyncio.create_task(self._single_flight.do(key, lambda: self._fetch(key, loader, expired)))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _invalidate(self, key):
+        self._generation += 1
+        self._local.delete(key)
+        if self.mode == "pubsub":
+            await self._storage.redis_client.publish(self.invalidation_channel, key)
+
+    def _on_invalidate(self, keys):
+        self._generation += 1
+        self.invalidations += 1
+        if keys is None:
+            # FLUSHALL/FLUSHDB 或连接重建时无法确定失效范围，清空本地缓存
+            self._local.clear()
+            return
+        for key in keys:
+            self._local.delete(key.decode("utf-8") if isinstance(key, bytes) else key)
+
+    async def _open_tracking_connections(self):
+        pool = self._storage.redis_client.connection_pool
+        listener = pool.make_connection()
+        tracker = pool.make_connection()
+        try:
+            await listener.connect()
+            await listener.send_command("CLIENT", "ID")
+            client_id = await listener.read_response()
+            await listener.send_command("SUBSCRIBE", TRACKING_CHANNEL)
+            await listener.read_response()
+            # BCAST 模式下 tracker 连接订阅的前缀内任何 key 被修改，都会把失效通知转发到 listener 连接
+            args = ["CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST"]
+            for prefix in self.prefixes:
+                args += ["PREFIX", prefix]
+            await tracker.connect()
+            await tracker.send_command(*args)
+            await tracker.read_response()
+        except BaseException:
+            await listener.disconnect()
+            await tracker.disconnect()
+            raise
+        return listener, tracker
+
+    async def _listen_tracking(self, connections):
+        while True:
+            listener, tracker = connections
+            try:
+                while True:
+                    response = await listener.read_response()
+                    if isinstance(response, list) and len(response) == 3 and response[0] == b"message":
+                        self._on_invalidate(response[2])
+            except asyncio.CancelledError:
+                await listener.disconnect()
+                await tracker.disconnect()
+                raise
+            except Exception as e:
+                logger.error(f"Redis 失效通知连接断开，重连中: {e}")
+                await listener.disconnect()
+                await tracker.disconnect()
+            # 断线期间可能错过失效通知
+            self._on_invalidate(None)
+            while True:
+                await asyncio.sleep(self.reconnect_interval)
+                try:
+                    connections = await self._open_tracking_connections()
+                    break
+                except Exception as e:
+                    logger.error(f"Redis 失效通知重连失败: {e}")
+
+    async def _listen_pubsub(self):
+        while True:
+            pubsub = pubsub_client(self._storage.redis_client, self.invalidation_channel).pubsub()
+            try:
+                await pubsub.subscribe(self.invalidation_channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._on_invalidate([message["data"]])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis 失效通道连接断开，重连中: {e}")
+            finally:
+                await pubsub.aclose()
+            self._on_invalidate(None)
+            await asyncio.sleep(self.reconnect_interval)
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+import uuid
+from typing import Optional, Tuple
+
+import redis.asyncio as aioredis
+
+"""
+基于 Redis Lua 脚本的分布式限流器: 令牌桶与滑动窗口。
+
+脚本在服务端原子地完成判断与扣减，并使用 Redis 服务器时间，多个进程之间不受本地时钟偏差影响。
+获取失败时脚本返回还需等待的毫秒数，acquire 据此休眠后再试，不做忙轮询。
+"""
+
+# KEYS[1]: 桶; ARGV: 每秒生成令牌数, 容量, 请求数, 最少授予数
+# 返回 {授予数, 需等待毫秒数}
+_TOKEN_BUCKET_SCRIPT = """
+redis.replicate_commands()
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local min_granted = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+
+local granted = math.min(math.floor(tokens), requested)
+local wait = 0
+if granted < min_granted then
+    granted = 0
+    wait = math.ceil((min_granted - tokens) * 1000 / rate)
+end
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return {granted, wait}
+"""
+
+# KEYS[1]: 窗口内请求的有序集合; ARGV: 窗口内上限, 窗口毫秒数, 请求数, 最少授予数, 成员前缀
+# 返回 {授予数, 需等待毫秒数}
+_SLIDING_WINDOW_SCRIPT = """
+redis.replicate_commands()
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local min_granted = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+local granted = math.min(limit - count, requested)
+if granted < min_granted then
+    -- 最早的若干请求滑出窗口后才有足够额度
+    local oldest = redis.call('ZRANGE', KEYS[1], count + min_granted - limit - 1, count + min_granted - limit - 1, 'WITHSCORES')
+    local wait = 1
+    if oldest[2] then
+        wait = math.max(1, tonumber(oldest[2]) + window - now)
+    end
+    return {0, wait}
+end
+for i = 1, granted do
+    redis.call('ZADD', KEYS[1], now, ARGV[5] .. i)
+end
+redis.call('PEXPIRE', KEYS[1], window)
+return {granted, 0}
+"""
+
+
+class _RedisRateLimiter:
+    def __init__(self, redis_client: aioredis.Redis, key: str, lease: int = 1, lease_ttl: float = 1.0) -> None:
+        """
+        Args:
+            redis_client: Redis 客户端，通常由 RedisInstanceManager.get_redis_instance 获取
+            key: 限流 key，所有共用该 key 的进程共享额度
+            lease: 每次向 Redis 预取的令牌数，大于 1 时多余的令牌留在本地使用，减少往返次数
+            lease_ttl: 本地预取令牌的有效期(秒)，过期未用完的令牌作废，避免积攒后突发
+        """
+        self._redis_client = redis_client
+        self.key = key
+        self.lease = lease
+        self.lease_ttl = lease_ttl
+        self.granted = 0
+        self.rejected = 0
+        self.round_trips = 0
+        self._leased = 0
+        self._leased_until = 0.0
+        self._refilling: Optional[asyncio.Event] = None
+
+    async def try_acquire(self, count: int = 1) -> bool:
+        """尝试获取 count 个令牌，额度不足时立即返回 False；其他协程正在预取令牌时先等待其完成"""
+        granted, _ = await self._acquire(count)
+        return granted
+
+    async def acquire(self, count: int = 1, timeout: Optional[float] = None) -> bool:
+        """获取 count 个令牌，额度不足时按脚本返回的等待时间休眠后重试，超过 timeout 秒未获取到时返回 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if deadline is None:
+                granted, wait_ms = await self._acquire(count)
+            else:
+                try:
+                    granted, wait_ms = await asyncio.wait_for(
+                        self._acquire(count), max(deadline - time.monotonic(), 0)
+                    )
+                except asyncio.TimeoutError:
+                    return False
+            if granted:
+                return True
+            delay = max(wait_ms, 1) / 1000
+            if deadline is not None and time.monotonic() + delay > deadline:
+                return False
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "round_trips": self.round_trips,
+            "leased": self._leased,
+        }
+
+    async def _acquire(self, count) -> Tuple[bool, int]:
+        # 本地令牌的增减之间没有 await，在事件循环内是原子的；访问 Redis 期间不持有任何锁，并发调用各自往返。
+        # 只有预取(lease > 1)时合并补充: 已有协程在预取，则等它完成后先从本地取，避免并发重复预取造成额度浪费
+        if self._take(count):
+            return True, 0
+        refilling = self._refilling
+        if refilling is not None:
+            await refilling.wait()
+            if self._take(count):
+                return True, 0
+        if self.lease > count and self._refilling is None:
+            refilling = self._refilling = asyncio.Event()
+        else:
+            refilling = None
+        self.round_trips += 1
+        try:
+            granted, wait_ms = await self._call(max(count, self.lease), count)
+        finally:
+            if refilling is not None:
+                self._refilling = None
+                refilling.set()
+        if not granted:
+            self.rejected += 1
+            return False, int(wait_ms)
+        surplus = int(granted) - count
+        if surplus:
+            if not self._leased or time.monotonic() >= self._leased_until:
+                self._leased = 0
+                self._leased_until = time.monotonic() + self.lease_ttl
+            self._leased += surplus
+        self.granted += count
+        return True, 0
+
+    def _take(self, count) -> bool:
+        if time.monotonic() >= self._leased_until:
+            self._leased = 0
+        if self._leased < count:
+            return False
+        self._leased -= count
+        self.granted += count
+        return True
+
+    async def _call(self, requested, min_granted):
+        raise NotImplementedError
+
+
+class TokenBucketRateLimiter(_RedisRateLimiter):
+    """
+    令牌桶限流: 每秒生成 rate 个令牌，最多积攒 capacity 个，允许不超过 capacity 的突发。
+
+    >>> limiter = TokenBucketRateLimiter(redis_client, "rate:moji", rate=10, capacity=20)
+    >>> await limiter.acquire()
+    """
+
+    def __init__(self, redis_client: aioredis.Redis, key: str, rate: float, capacity: Optional[int] = None,
+                 lease: int = 1, lease_ttl: float = 1.0) -> None:
+        super().__init__(redis_client, key, lease, lease_ttl)
+        if rate <= 0:
+            raise ValueError("Rate must be greater than 0.")
+        self.rate = rate
+        self.capacity = capacity or max(int(rate), 1)
+        if max(self.lease, 1) > self.capacity:
+            raise ValueError("Lease must not exceed bucket capacity.")
+        self._script = redis_client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    async def _call(self, requested, min_granted):
+        if min_granted > self.capacity:
+            raise ValueError(f"Cannot acquire {min_granted} tokens from a bucket of capacity {self.capacity}.")
+        return await self._script(keys=[self.key], args=[self.rate, self.capacity, requested, min_granted])
+
+
+class SlidingWindowRateLimiter(_RedisRateLimiter):
+    """
+    滑动窗口限流: 任意 window 秒内最多 limit 次，精确计数，没有固定窗口边界处的突发。
+
+    >>> limiter = SlidingWindowRateLimiter(redis_client, "rate:sms", limit=100, window=60)
+    >>> if await limiter.try_acquire(): ...
+    """
+
+    def __init__(self, redis_client: aioredis.Redis, key: str, limit: int, window: float,
+                 lease: int = 1, lease_ttl: float = 1.0) -> None:
+        super().__init__(redis_client, key, lease, lease_ttl)
+        if limit <= 0 or window <= 0:
+            raise ValueError("Limit and window must be greater than 0.")
+        if max(self.lease, 1) > limit:
+            raise ValueError("Lease must not exceed window limit.")
+        self.limit = limit
+        self.window_ms = int(window * 1000)
+        self._script = redis_client.register_script(_SLIDING_WINDOW_SCRIPT)
+
+    async def _call(self, requested, min_granted):
+        if min_granted > self.limit:
+            raise ValueError(f"Cannot acquire {min_granted} permits from a window limit of {self.limit}.")
+        member_prefix = f"{uuid.uuid4().hex}:"
+        return await self._script(
+            keys=[self.key], args=[self.limit, self.window_ms, requested, min_granted, member_prefix]
+        )
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import bisect
+import hashlib
+from collections import defaultdict
+from typing import Any, Dict, List, Union
+
+import redis.asyncio as aioredis
+from redis.asyncio.cluster import RedisCluster
+
+"""多个独立 Redis 节点之间的客户端一致性哈希分片"""
+
+KeyT = Union[str, bytes]
+
+
+def _hash(value: bytes) -> int:
+    return int.from_bytes(hashlib.md5(value).digest()[:8], "big")
+
+
+def _hash_slot_key(key: KeyT) -> bytes:
+    """与 Redis Cluster 相同的 hash tag 规则: key 中包含非空的 {...} 时只按其中的内容分片，便于让相关 key 落到同一节点"""
+    if isinstance(key, str):
+        key = key.encode("utf-8")
+    start = key.find(b"{")
+    if start != -1:
+        end = key.find(b"}", start + 1)
+        if end > start + 1:
+            return key[start + 1:end]
+    return key
+
+
+def has_hash_tag(key: KeyT) -> bool:
+    raw = key.encode("utf-8") if isinstance(key, str) else key
+    return _hash_slot_key(raw) != raw
+
+
+def is_distributed(redis_client) -> bool:
+    """客户端的 key 是否分布在多个节点(Redis Cluster 或 ShardedRedis)，多 key 命令和脚本需要 hash tag"""
+    return isinstance(redis_client, (RedisCluster, ShardedRedis))
+
+
+def pubsub_client(redis_client, channel: str):
+    """
+    返回可以订阅 channel 的客户端: 分片时为 channel 所在节点(PUBLISH 也按 channel 路由到该节点)；
+    redis.asyncio 的 RedisCluster 不支持 pub/sub，返回 None。
+    """
+    if isinstance(redis_client, ShardedRedis):
+        return redis_client.get_node(channel)
+    if isinstance(redis_client, RedisCluster):
+        return None
+    return redis_client
+
+
+class ShardedRedis:
+    """
+    按一致性哈希把 key 分布到多个独立 Redis 节点，接口与 redis.asyncio.Redis 一致，可以直接传给 AsyncRedisStorage。
+
+    - 单 key 命令按第一个参数(key)路由，xread/xreadgroup 按 stream 名路由，eval/evalsha 按第一个 key 路由；
+    - mget/delete/exists/unlink 按节点拆分后并发执行再合并结果；
+    - pipeline 按节点拆成多个 pipeline 并发执行，结果按命令顺序返回，不支持跨节点事务；
+    - 多 key 的 Lua 脚本要求所有 key 带相同的 hash tag(如 {order:1}:lock 与 {order:1}:fence)；
+    - 增删节点时只有约 1/N 的 key 改变归属。pubsub() 不带 key 无法路由，需通过 pubsub_client(client, channel) 获取节点。
+    """
+
+    def __init__(self, nodes: Dict[str, aioredis.Redis], replicas: int = 160) -> None:
+        """
+        Args:
+            nodes: 节点名称到客户端的映射，节点名称参与哈希，调整顺序或地址不变时不影响 key 的归属
+            replicas: 每个节点在哈希环上的虚拟节点数，越大分布越均匀
+        """
+        if not nodes:
+            raise ValueError("ShardedRedis requires at least one node.")
+        self.nodes = dict(nodes)
+        ring = sorted(
+            (_hash(f"{name}#{index}".encode("utf-8")), name) for name in self.nodes for index in range(replicas)
+        )
+        self._ring_hashes = [point for point, _ in ring]
+        self._ring_nodes = [name for _, name in ring]
+
+    def get_node_name(self, key: KeyT) -> str:
+        index = bisect.bisect(self._ring_hashes, _hash(_hash_slot_key(key))) % len(self._ring_hashes)
+        return self._ring_nodes[index]
+
+    def get_node(self, key: KeyT) -> aioredis.Redis:
+        return self.nodes[self.get_node_name(key)]
+
+    def __getattr__(self, command: str):
+        if command.startswith("_") or not hasattr(aioredis.Redis, command):
+            raise AttributeError(command)
+
+        def route(*args, **kwargs):
+            return getattr(self.get_node(_routing_key(command, args, kwargs)), command)(*args, **kwargs)
+
+        return route
+
+    def get_encoder(self):
+        # AsyncScript 通过 get_encoder 计算脚本的 SHA1
+        return next(iter(self.nodes.values())).connection_pool.get_encoder()
+
+    def register_script(self, script):
+        from redis.commands.core import AsyncScript
+        return AsyncScript(self, script)
+
+    async def script_load(self, script) -> str:
+        """在所有节点加载脚本，返回 SHA1"""
+        results = await asyncio.gather(*(client.script_load(script) for client in self.nodes.values()))
+        return results[0]
+
+    async def mget(self, keys, *args) -> List[Any]:
+        keys = [keys, *args] if isinstance(keys, (str, bytes)) else [*keys, *args]
+        groups = self._group_by_node(keys)
+        results = await asyncio.gather(*(self.nodes[name].mget([keys[i] for i in indexes])
+                                         for name, indexes in groups.items()))
+        values = [None] * len(keys)
+        for indexes, group_values in zip(groups.values(), results):
+            for index, value in zip(indexes, group_values):
+                values[index] = value
+        return values
+
+    async def delete(self, *names) -> int:
+        return await self._fan_out_count("delete", names)
+
+    async def unlink(self, *names) -> int:
+        return await self._fan_out_count("unlink", names)
+
+    async def exists(self, *names) -> int:
+        return await self._fan_out_count("exists", names)
+
+    def pipeline(self, transaction: bool = False) -> "ShardedPipeline":
+        if transaction:
+            raise ValueError("ShardedRedis pipelines cannot be transactional across nodes.")
+        return ShardedPipeline(self)
+
+    async def aclose(self) -> None:
+        await asyncio.gather(*(client.aclose(close_connection_pool=True) for client in self.nodes.values()))
+
+    def _group_by_node(self, keys) -> Dict[str, List[int]]:
+        groups = defaultdict(list)
+        for index, key in enumerate(keys):
+            groups[self.get_node_name(key)].append(index)
+        return groups
+
+    async def _fan_out_count(self, command, names):
+        if not names:
+            return 0
+        groups = self._group_by_node(names)
+        results = await asyncio.gather(*(getattr(self.nodes[name], command)(*(names[i] for i in indexes))
+                                         for name, indexes in groups.items()))
+        return sum(results)
+
+
+def _routing_key(command, args, kwargs):
+    if command in ("xread", "xreadgroup"):
+        streams = kwargs.get("streams") or args[2 if command == "xreadgroup" else 0]
+        return next(iter(streams))
+    if command in ("eval", "evalsha"):
+        if int(args[1]) < 1:
+            raise ValueError(f"ShardedRedis cannot route {command} without keys.")
+        return args[2]
+    if args:
+        return args[0]
+    if "name" in kwargs:
+        return kwargs["name"]
+    raise ValueError(f"ShardedRedis cannot route {command} without a key.")
+
+
+class ShardedPipeline:
+    """按节点拆分的非事务 pipeline，execute 返回的结果与命令顺序一致"""
+
+    def __init__(self, sharded: ShardedRedis) -> None:
+        self._sharded = sharded
+        self._commands = []
+
+    async def __aenter__(self) -> "ShardedPipeline":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self._commands = []
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def __getattr__(self, command: str):
+        if command.startswith("_") or not hasattr(aioredis.Redis, command):
+            raise AttributeError(command)
+
+        def queue(*args, **kwargs):
+            node = self._sharded.get_node_name(_routing_key(command, args, kwargs))
+            self._commands.append((node, command, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self, raise_on_error: bool = True) -> List[Any]:
+        commands, self._commands = self._commands, []
+        pipelines = {}
+        positions = defaultdict(list)
+        for index, (node, command, args, kwargs) in enumerate(commands):
+            if node not in pipelines:
+                pipelines[node] = self._sharded.nodes[node].pipeline(transaction=False)
+            getattr(pipelines[node], command)(*args, **kwargs)
+            positions[node].append(index)
+        results = await asyncio.gather(*(pipeline.execute(raise_on_error=raise_on_error)
+                                         for pipeline in pipelines.values()))
+        ordered = [None] * len(commands)
+        for node, node_results in zip(pipelines, results):
+            for index, result in zip(positions[node], node_results):
+                ordered[index] = result
+        return ordered
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import socket
+from typing import Awaitable, Callable, Generic, List, Optional, Tuple, TypeVar
+
+import redis.asyncio as aioredis
+from redis.exceptions import ResponseError
+
+from .redis_codecs import Codec, UJsonCodec, decode_value
+from ..logging.logger import logger
+
+"""基于 Redis Streams 的可靠消息队列: 消费组、批量读取与确认、超时消息回收和死信"""
+
+T = TypeVar("T")
+
+_DATA_FIELD = b"data"
+
+
+class RedisStreamQueue(Generic[T]):
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        stream: str,
+        group: str,
+        consumer: Optional[str] = None,
+        codec: Optional[Codec] = None,
+        max_deliveries: int = 5,
+        dead_letter_stream: Optional[str] = None,
+        maxlen: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            stream: Stream 名称
+            group: 消费组名称
+            consumer: 消费者名称，默认 主机名-进程号
+            max_deliveries: 消息投递次数达到该值仍未确认时转入死信 Stream
+            dead_letter_stream: 死信 Stream 名称，默认 <stream>:dead
+            maxlen: Stream 近似最大长度，为空时不裁剪
+        """
+        self._redis_client = redis_client
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self._codec = codec or UJsonCodec()
+        self.max_deliveries = max_deliveries
+        self.dead_letter_stream = dead_letter_stream or f"{stream}:dead"
+        self.maxlen = maxlen
+
+    async def ensure_group(self, start_id: str = "0") -> None:
+        """创建消费组(Stream 不存在时一并创建)，已存在时忽略"""
+        try:
+            await self._redis_client.xgroup_create(self.stream, self.group, id=start_id, mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def add(self, message: T) -> bytes:
+        return await self._redis_client.xadd(
+            self.stream, {_DATA_FIELD: self._codec.encode(message)}, maxlen=self.maxlen, approximate=True
+        )
+
+    async def add_many(self, messages: List[T]) -> List[bytes]:
+        if not messages:
+            return []
+        pipeline = self._redis_client.pipeline(transaction=False)
+        for message in messages:
+            pipeline.xadd(self.stream, {_DATA_FIELD: self._codec.encode(message)}, maxlen=self.maxlen, approximate=True)
+        return await pipeline.execute()
+
+    async def read(self, count: int = 100, block_ms: Optional[int] = 5000) -> List[Tuple[bytes, T]]:
+        """读取最多 count 条新消息，没有消息时最多阻塞 block_ms 毫秒"""
+        response = await self._redis_client.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"}, count=count, block=block_ms
+        )
+        if not response:
+            return []
+        return self._decode_entries(response[0][1])
+
+    async def ack(self, message_ids: List[bytes]) -> int:
+        if not message_ids:
+            return 0
+        return await self._redis_client.xack(self.stream, self.group, *message_ids)
+
+    async def reclaim(self, min_idle_ms: int = 60000, count: int = 100) -> List[Tuple[bytes, T]]:
+        """
+        回收其他消费者超过 min_idle_ms 未确认的消息并转给当前消费者处理；
+        投递次数达到 max_deliveries 的消息转入死信 Stream 并确认，不再重试。
+        """
+        await self._move_to_dead_letter(min_idle_ms, count)
+        result = await self._redis_client.xautoclaim(
+            self.stream, self.group, self.consumer, min_idle_ms, start_id="0-0", count=count
+        )
+        return self._decode_entries(result[1])
+
+    async def pending_count(self) -> int:
+        summary = await self._redis_client.xpending(self.stream, self.group)
+        return summary["pending"]
+
+    async def _move_to_dead_letter(self, min_idle_ms, count):
+        pending = await self._redis_client.xpending_range(
+            self.stream, self.group, min="-", max="+", count=count, idle=min_idle_ms
+        )
+        deliveries = {
+            entry["message_id"]: entry["times_delivered"] for entry in pending
+            if entry["times_delivered"] >= self.max_deliveries
+        }
+        if not deliveries:
+            return
+        claimed = await self._redis_client.xclaim(
+            self.stream, self.group, self.consumer, min_idle_ms, list(deliveries)
+        )
+        pipeline = self._redis_client.pipeline(transaction=False)
+        for message_id, fields in claimed:
+            if fields:
+                pipeline.xadd(self.dead_letter_stream, {
+                    **fields, b"source_id": message_id, b"deliveries": deliveries.get(message_id, 0)
+                })
+        pipeline.xack(self.stream, self.group, *deliveries)
+        await pipeline.execute()
+        logger.warning(f"{len(deliveries)} 条消息超过最大投递次数，转入死信: {self.dead_letter_stream}")
+
+    @staticmethod
+    def _decode_entries(entries):
+        messages = []
+        for message_id, fields in entries:
+            # 已被删除的消息 fields 为空
+            if fields and _DATA_FIELD in fields:
+                messages.append((message_id, decode_value(fields[_DATA_FIELD])))
+        return messages
+
+
+class StreamWorker(Generic[T]):
+    """
+    Stream 消费者运行器: 批量读取消息，在 concurrency 并发内调用 handler，处理成功的消息按批确认；
+    处理失败的消息保持未确认，由定期的 reclaim 重新投递，超过最大投递次数后进入死信。
+    """
+
+    def __init__(
+        self,
+        queue: RedisStreamQueue[T],
+        handler: Callable[[T], Awaitable[None]],
+        concurrency: int = 10,
+        batch_size: int = 100,
+        block_ms: int = 5000,
+        reclaim_interval: float = 30,
+        min_idle_ms: int = 60000,
+    ) -> None:
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.reclaim_interval = reclaim_interval
+        self.min_idle_ms = min_idle_ms
+        self.processed = 0
+        self.failed = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._running = False
+
+    async def run(self) -> None:
+        await self.queue.ensure_group()
+        self._running = True
+        loop = asyncio.get_running_loop()
+        next_reclaim = loop.time()
+        while self._running:
+            try:
+                if loop.time() >= next_reclaim:
+                    messages = await self.queue.reclaim(self.min_idle_ms, self.batch_size)
+                    next_reclaim = loop.time() + self.reclaim_interval
+                    if messages:
+                        await self._process(messages)
+                messages = await self.queue.read(self.batch_size, self.block_ms)
+                if messages:
+                    await self._process(messages)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Stream 消费异常: {self.queue.stream}, 错误={e}")
+                await asyncio.sleep(1)
+
+    def stop(self) -> None:
+        """当前批次处理完成后退出 run"""
+        self._running = False
+
+    async def _process(self, messages):
+        results = await asyncio.gather(*(self._handle(message_id, message) for message_id, message in messages))
+        await self.queue.ack([message_id for message_id in results if message_id is not None])
+
+    async def _handle(self, message_id, message):
+        async with self._semaphore:
+            try:
+                await self.handler(message)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Stream 消息处理失败: {self.queue.stream} {message_id}, 错误={e}")
+                return None
+            self.processed += 1
+            return message_id
@@ -1,60 +1,242 @@
 # -*- coding: utf-8 -*-
-import ujson
-from typing import TypeVar, Generic, Union
+import asyncio
+from typing import Any, TypeVar, Generic, Union, List, Iterable, Tuple
 
 import redis.asyncio as aioredis
+from redis.asyncio.cluster import ClusterNode, RedisCluster
+from redis.asyncio.sentinel import Sentinel
+from ..base_class.lazy_proxy import LazyProxy
+from .redis_codecs import Codec, UJsonCodec, decode_value
+from .redis_lock import RedisLock
+from .redis_sharding import ShardedRedis
+from .redis_stream_queue import RedisStreamQueue
 from ..system.sys_env import get_env
 from typing import Optional, Dict
+from ..logging.logger import logger
 
 
 T = TypeVar("T")
 
 
+def _parse_nodes(value: str) -> List[Tuple[str, int]]:
+    """解析 host1:port1,host2:port2 格式的节点列表"""
+    nodes = []
+    for item in value.split(","):
+        host, _, port = item.strip().rpartition(":")
+        nodes.append((host, int(port)))
+    return nodes
+
+
+def _pool_stats(pool) -> dict:
+    in_use = len(pool._in_use_connections)
+    idle = len(pool._available_connections)
+    return {
+        "max_connections": pool.max_connections,
+        "created": in_use + idle,
+        "in_use": in_use,
+        "idle": idle,
+    }
+
+
 class RedisInstanceManager:
-    _instances: Dict[int, aioredis.Redis] = {}
+    """
+    按完整连接参数缓存 Redis 客户端，相同参数共用一个连接池。
+
+    支持单机、Redis Cluster、Sentinel 以及多个单机节点之间的一致性哈希分片(ShardedRedis)，
+    返回的客户端都可以直接传给 AsyncRedisStorage。
+    """
+
+    _instances: Dict[tuple, Any] = {}
+    _labels: Dict[tuple, str] = {}
 
     @classmethod
     def get_redis_instance(
         cls, db: int, host: str, port: int, password: Optional[str], max_connections: int
     ) -> aioredis.Redis:
-        if db not in cls._instances:
+        spec = ("standalone", host, int(port), int(db), password or None)
+        if spec not in cls._instances:
             pool = aioredis.ConnectionPool(
                 host=host,
-                port=port,
-                password=password,
-                db=db,
+                port=int(port),
+                password=password or None,
+                db=int(db),
                 decode_responses=False,  # 不自动解码数据
                 max_connections=max_connections,  # 限制连接数
             )
-            redis_client = aioredis.Redis(connection_pool=pool)
-            cls._instances[db] = redis_client
-        return cls._instances[db]
+            cls._register(spec, f"redis:{host}:{port}/{db}", aioredis.Redis(connection_pool=pool))
+        return cls._instances[spec]
+
+    @classmethod
+    def get_cluster_instance(
+        cls, startup_nodes: List[Tuple[str, int]], password: Optional[str], max_connections: int
+    ) -> RedisCluster:
+        """Redis Cluster 客户端，max_connections 为每个节点的连接上限"""
+        spec = ("cluster", tuple(sorted((host, int(port)) for host, port in startup_nodes)), password or None)
+        if spec not in cls._instances:
+            redis_client = RedisCluster(
+                startup_nodes=[ClusterNode(host, port) for host, port in spec[1]],
+                password=password or None,
+                decode_responses=False,
+                max_connections=max_connections,
+            )
+            cls._register(spec, f"cluster:{','.join(f'{host}:{port}' for host, port in spec[1])}", redis_client)
+        return cls._instances[spec]
+
+    @classmethod
+    def get_sentinel_instance(
+        cls,
+        sentinels: List[Tuple[str, int]],
+        service_name: str,
+        db: int,
+        password: Optional[str],
+        max_connections: int,
+        sentinel_password: Optional[str] = None,
+        readonly: bool = False,
+    ) -> aioredis.Redis:
+        """
+        通过 Sentinel 发现主节点的客户端，主从切换后自动连接新的主节点；readonly=True 时连接从节点。
+        """
+        spec = ("sentinel", tuple(sorted((host, int(port)) for host, port in sentinels)), service_name, int(db),
+                password or None, sentinel_password or None, readonly)
+        if spec not in cls._instances:
+            sentinel = Sentinel(
+                list(spec[1]),
+                sentinel_kwargs={"password": sentinel_password} if sentinel_password else None,
+                password=password or None,
+                db=int(db),
+                decode_responses=False,
+            )
+            factory = sentinel.slave_for if readonly else sentinel.master_for
+            role = "replica" if readonly else "master"
+            cls._register(spec, f"sentinel:{service_name}/{db}:{role}",
+                          factory(service_name, max_connections=max_connections))
+        return cls._instances[spec]
+
+    @classmethod
+    def get_sharded_instance(
+        cls, nodes: List[Tuple[str, int]], db: int, password: Optional[str], max_connections: int,
+        replicas: int = 160
+    ) -> ShardedRedis:
+        """多个单机节点的一致性哈希分片客户端，max_connections 为每个节点的连接上限"""
+        spec = ("sharded", tuple((host, int(port)) for host, port in nodes), int(db), password or None)
+        if spec not in cls._instances:
+            clients = {
+                f"{host}:{port}": cls.get_redis_instance(db, host, port, password, max_connections)
+                for host, port in spec[1]
+            }
+            cls._register(spec, None, ShardedRedis(clients, replicas=replicas))
+        return cls._instances[spec]
+
+    @classmethod
+    def from_env(cls, db: int = 0, max_connections: int = 5000):
+        """
+        按环境变量选择部署模式:
+          REDIS_CLUSTER_NODES=h1:p1,h2:p2              Redis Cluster
+          REDIS_SENTINELS=h1:p1,h2:p2 + REDIS_SENTINEL_SERVICE   Sentinel
+          REDIS_SHARD_NODES=h1:p1,h2:p2                单机节点一致性哈希分片
+          否则使用 REDIS_HOST/REDIS_PORT 单机
+        REDIS_PASSWORD 对所有模式生效。
+
+        AsyncRedisStorage 的读写、批量操作、队列和锁在各模式下都可用；Cluster/分片模式下:
+          - 业务代码自己执行的多 key 命令、事务和 Lua 脚本需要让 key 带相同的 hash tag；
+          - RedisLock 等待锁时 Cluster 退化为有界轮询，AsyncRedisNearCache 不支持 Cluster。
+        """
+        password = get_env("REDIS_PASSWORD", "")
+        if get_env("REDIS_CLUSTER_NODES"):
+            return cls.get_cluster_instance(_parse_nodes(get_env("REDIS_CLUSTER_NODES")), password, max_connections)
+        if get_env("REDIS_SENTINELS"):
+            return cls.get_sentinel_instance(
+                _parse_nodes(get_env("REDIS_SENTINELS")), get_env("REDIS_SENTINEL_SERVICE", "mymaster"), db,
+                password, max_connections, sentinel_password=get_env("REDIS_SENTINEL_PASSWORD"),
+            )
+        if get_env("REDIS_SHARD_NODES"):
+            return cls.get_sharded_instance(_parse_nodes(get_env("REDIS_SHARD_NODES")), db, password, max_connections)
+        return cls.get_redis_instance(
+            db=db,
+            host=get_env("REDIS_HOST", "localhost"),
+            port=get_env("REDIS_PORT", 6379),
+            password=password,
+            max_connections=max_connections,
+        )
+
+    @classmethod
+    def stats(cls) -> dict:
+        """返回每个连接池的连接数统计，key 为不含密码的连接名称"""
+        result = {}
+        for spec, redis_client in cls._instances.items():
+            label = cls._labels[spec]
+            if label is None:
+                # 分片客户端的各节点已作为单机实例单独统计
+                continue
+            if isinstance(redis_client, RedisCluster):
+                result[label] = {
+                    node.name: {
+                        "max_connections": node.max_connections,
+                        "created": len(node._connections),
+                        "idle": len(node._free),
+                        "in_use": len(node._connections) - len(node._free),
+                    }
+                    for node in redis_client.get_nodes()
+                }
+            else:
+                result[label] = _pool_stats(redis_client.connection_pool)
+        return result
 
     @classmethod
     async def close_all(cls):
-        for redis_instance in cls._instances.values():
-            # 关闭 Redis 实例（自动处理连接池）
-            await redis_instance.close()
+        for spec, redis_instance in cls._instances.items():
+            if cls._labels[spec] is None:
+                # 分片客户端的各节点作为单机实例关闭
+                continue
+            try:
+                if isinstance(redis_instance, aioredis.Redis):
+                    await redis_instance.aclose(close_connection_pool=True)
+                else:
+                    await redis_instance.aclose()
+            except Exception as e:
+                logger.error(f"关闭 Redis 连接失败: {cls._labels[spec]}, 错误={e}")
         cls._instances.clear()
+        cls._labels.clear()
+
+    @classmethod
+    def _register(cls, spec, label, redis_client):
+        cls._instances[spec] = redis_client
+        cls._labels[spec] = label
 
 
 class AsyncRedisStorage(Generic[T]):
-    def __init__(self, redis_client: aioredis.Redis) -> None:
+    def __init__(self, redis_client: aioredis.Redis, codec: Optional[Codec] = None) -> None:
         """
         初始化时接收 Redis 客户端实例。
+
+        codec 为写入时使用的编解码器(见 redis_codecs)，默认 ujson；读取时按数据首字节自动识别编码，
+        不同编解码器写入的数据可以混存。
         """
         self._redis_client = redis_client
+        self._codec = codec or UJsonCodec()
+        self._locks: Dict[str, RedisLock] = {}
+
+    @property
+    def redis_client(self) -> aioredis.Redis:
+        return self._redis_client
+
+    def _encode(self, data: T) -> bytes:
+        return self._codec.encode(data)
+
+    @staticmethod
+    def _decode(data: bytes) -> T:
+        return decode_value(data)
 
     async def set(self, key: str, data: T, expired: int = 7200) -> bool:
         if not key:
             raise ValueError("Key cannot be empty.")
-        return await self._redis_client.setex(key, expired, ujson.dumps(data))
+        return await self._redis_client.setex(key, expired, self._encode(data))
 
     async def get(self, key: str) -> Union[T, None]:
         if not key:
             raise ValueError("Key cannot be empty.")
         data = await self._redis_client.get(key)
-        return ujson.loads(data) if data else None
+        return self._decode(data) if data else None
 
     async def delete(self, key: str) -> None:
         if not key:
@@ -62,34 +244,177 @@ class AsyncRedisStorage(Generic[T]):
         await self._redis_client.delete(key)
 
     async def enqueue_message(self, queue_name: str, message: T) -> None:
-        await self._redis_client.lpush(queue_name, ujson.dumps(message))
+        await self._redis_client.lpush(queue_name, self._encode(message))
 
     async def dequeue_message(self, queue_name: str, timeout: int = 0) -> Union[T, None]:
         message = await self._redis_client.brpop([queue_name], timeout=timeout)
-        return ujson.loads(message[1]) if message else None
+        return self._decode(message[1]) if message else None
 
     async def get_queue_length(self, queue_name: str) -> int:
         return await self._redis_client.llen(queue_name)
 
     async def acquire_lock(self, key: str, timeout: int = 60) -> bool:
+        """尝试获取锁(不等待)，令牌保存在本实例中，只有本实例的 release_lock 能释放"""
         if timeout <= 0:
             raise ValueError("Lock timeout must be greater than 0 seconds.")
-        return await self._redis_client.set(key, "lock", ex=timeout)
+        lock = RedisLock(self._redis_client, key, ttl=timeout)
+        if not await lock.acquire(blocking=False):
+            return False
+        self._locks[key] = lock
+        return True
 
     async def release_lock(self, key: str) -> None:
-        await self._redis_client.delete(key)
+        lock = self._locks.pop(key, None)
+        if lock is not None:
+            await lock.release()
+
+    def lock(self, key: str, timeout: float = 60, auto_renew: bool = False,
+             blocking_timeout: Optional[float] = None, metrics_name: Optional[str] = None) -> RedisLock:
+        """
+        创建分布式锁对象，支持等待、自动续期和 fencing token，见 RedisLock。
+
+        >>> async with async_redis_storage.lock("lock:job", timeout=10, auto_renew=True) as lock:
+        >>>     ...
+        """
+        return RedisLock(self._redis_client, key, ttl=timeout, auto_renew=auto_renew,
+                         blocking_timeout=blocking_timeout, metrics_name=metrics_name)
 
     async def lrange_messages(self, queue_name: str) -> list:
         messages = await self._redis_client.lrange(queue_name, 0, -1)
-        return [ujson.loads(msg) for msg in messages]
+        return [self._decode(msg) for msg in messages]
+
+    async def mget(self, keys: List[str]) -> List[Union[T, None]]:
+        """批量读取，单机时一次往返，返回值与 keys 一一对应，不存在的 key 为 None"""
+        if not keys:
+            return []
+        if isinstance(self._redis_client, RedisCluster):
+            # 集群的 MGET 要求所有 key 在同一个 slot，按 slot 拆分后发送
+            values = await self._redis_client.mget_nonatomic(keys)
+        else:
+            values = await self._redis_client.mget(keys)
+        return [self._decode(value) if value else None for value in values]
+
+    async def mset_ex(self, mapping: Dict[str, T], expired: int = 7200) -> bool:
+        """批量写入并设置相同的过期时间，通过非事务 pipeline 一次往返发送"""
+        if not mapping:
+            return True
+        if not all(mapping):
+            raise ValueError("Key cannot be empty.")
+        pipeline = self._redis_client.pipeline(transaction=False)
+        for key, data in mapping.items():
+            pipeline.setex(key, expired, self._encode(data))
+        return all(await pipeline.execute())
+
+    async def mdelete(self, keys: List[str]) -> int:
+        """批量删除，返回实际删除的 key 数量"""
+        if not keys:
+            return 0
+        return await self._redis_client.delete(*keys)
+
+    async def enqueue_many(self, queue_name: str, messages: Iterable[T]) -> int:
+        """批量入队，出队顺序与 messages 顺序一致，返回入队后的队列长度"""
+        encoded = [self._encode(message) for message in messages]
+        if not encoded:
+            return await self.get_queue_length(queue_name)
+        return await self._redis_client.lpush(queue_name, *encoded)
+
+    def batcher(self, max_batch: int = 100, flush_interval: float = 0.005) -> "RedisPipelineBatcher[T]":
+        """
+        创建自动合并请求的 pipeline 批处理器，数量达到 max_batch 或等待超过 flush_interval 秒时统一发送。
+
+        >>> async with async_redis_storage.batcher() as batch:
+        >>>     values = await asyncio.gather(*(batch.get(key) for key in keys))
+        """
+        return RedisPipelineBatcher(self, max_batch, flush_interval)
+
+    def stream_queue(self, stream: str, group: str, consumer: Optional[str] = None, **kwargs) -> RedisStreamQueue[T]:
+        """
+        创建基于 Redis Streams 的可靠队列，与本实例共用连接和编解码器。
+        消息在确认前不会丢失，参数见 RedisStreamQueue。
+        """
+        return RedisStreamQueue(self._redis_client, stream, group, consumer, codec=self._codec, **kwargs)
+
+
+class RedisPipelineBatcher(Generic[T]):
+    def __init__(self, storage: AsyncRedisStorage[T], max_batch: int = 100, flush_interval: float = 0.005) -> None:
+        self._storage = storage
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._timer = None
+        self._flushing = set()
+
+    async def __aenter__(self) -> "RedisPipelineBatcher[T]":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.flush()
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+
+    def get(self, key: str) -> "asyncio.Future[Union[T, None]]":
+        if not key:
+            raise ValueError("Key cannot be empty.")
+        return self._add("get", (key,), lambda value: self._storage._decode(value) if value else None)
+
+    def set(self, key: str, data: T, expired: int = 7200) -> "asyncio.Future[bool]":
+        if not key:
+            raise ValueError("Key cannot be empty.")
+        return self._add("setex", (key, expired, self._storage._encode(data)), bool)
+
+    def delete(self, key: str) -> "asyncio.Future[int]":
+        if not key:
+            raise ValueError("Key cannot be empty.")
+        return self._add("delete", (key,), None)
+
+    def enqueue_message(self, queue_name: str, message: T) -> "asyncio.Future[int]":
+        return self._add("lpush", (queue_name, self._storage._encode(message)), None)
+
+    async def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        pipeline = self._storage._redis_client.pipeline(transaction=False)
+        for command, args, _, _ in pending:
+            getattr(pipeline, command)(*args)
+        try:
+            results = await pipeline.execute(raise_on_error=False)
+        except Exception as e:
+            for _, _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, decode, future), result in zip(pending, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(decode(result) if decode else result)
+
+    def _add(self, command, args, decode):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((command, args, decode, future))
+        if len(self._pending) >= self.max_batch:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self._schedule_flush)
+        return future
 
+    def _schedule_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
 
-# 创建 AsyncRedisStorage 默认实例
-async_redis_storage = AsyncRedisStorage(redis_client=RedisInstanceManager.get_redis_instance(
-    db=0,
-    host=get_env("REDIS_HOST", "localhost"),
-    port=get_env("REDIS_PORT", 6379),
-    password=get_env("REDIS_PASSWORD", ""),
-    max_connections=5000
-))
 
+# AsyncRedisStorage 默认实例，部署模式由环境变量决定，见 RedisInstanceManager.from_env；首次使用时才创建连接池
+async_redis_storage: AsyncRedisStorage = LazyProxy(
+    lambda: AsyncRedisStorage(redis_client=RedisInstanceManager.from_env(db=0, max_connections=5000))
+)
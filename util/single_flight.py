@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Hashable
+
+"""合并相同 key 的并发调用(single-flight)，同一时刻只有一个调用真正执行"""
+
+
+class SingleFlight:
+    def __init__(self, copy_result: bool = True) -> None:
+        """
+        Args:
+            copy_result: 为 True 时每个调用方拿到结果的独立深拷贝，互相修改不受影响
+        """
+        self.copy_result = copy_result
+        self._inflight = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        func 在独立的 task 中执行，所有调用方(包括发起方)通过 shield 等待，
+        任何一个调用方被取消(如客户端断开)都不会取消执行本身，也不会影响其他调用方。
+        """
+        self.calls += 1
+        entry = self._inflight.get(key)
+        if entry is not None:
+            self.coalesced += 1
+            entry[1] += 1
+            result = await asyncio.shield(entry[0])
+            return copy.deepcopy(result) if self.copy_result else result
+
+        task = asyncio.ensure_future(func())
+        entry = self._inflight[key] = [task, 0]
+        self.executions += 1
+        task.add_done_callback(lambda done: self._on_done(key, entry, done))
+        result = await asyncio.shield(task)
+        # 有等待方时 task 中保留原始结果供等待方拷贝，发起方自己拿一份拷贝
+        return copy.deepcopy(result) if self.copy_result and entry[1] else result
+
+    def _on_done(self, key, entry, task):
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # 所有调用方都已取消时标记异常已读取，避免 asyncio 告警
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "saved_ratio": round(self.coalesced / self.calls, 4) if self.calls else 0,
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+"""进程内 LRU + TTL 缓存，可同时按条目数与字节数限制容量"""
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = 60,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ) -> None:
+        """
+        Args:
+            max_entries: 最大条目数
+            max_bytes: 最大占用字节数，为空时不按字节限制
+            ttl: 默认过期时间(秒)，为空时不过期
+            sizeof: 计算条目大小的函数，set 时未显式传入 size 时使用
+            on_evict: 条目因容量淘汰或过期被移除时的回调
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._on_evict = on_evict
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        value, expire_at, _ = entry
+        if expire_at is not None and expire_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            if self._on_evict:
+                self._on_evict(key, value)
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def expire_at(self, key: Hashable) -> Optional[float]:
+        """返回条目的过期时刻(time.monotonic 时钟)，条目不存在或不过期时返回 None"""
+        entry = self._data.get(key)
+        return entry[1] if entry else None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, size: Optional[int] = None) -> None:
+        if key in self._data:
+            self._remove(key)
+        ttl = self.ttl if ttl is None else ttl
+        expire_at = time.monotonic() + ttl if ttl else None
+        if size is None:
+            size = self._sizeof(value) if self._sizeof else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self._data[key] = (value, expire_at, size)
+        self._bytes += size
+        self._evict()
+
+    def delete(self, key: Hashable) -> bool:
+        if key not in self._data:
+            return False
+        self._remove(key)
+        return True
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            key, (value, _, size) = self._data.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            if self._on_evict:
+                self._on_evict(key, value)